@@ -0,0 +1,299 @@
+"""Alerts for new DM9/DM13 signals, batched and rate-limited across pluggable sinks.
+
+Events come from the snapshot diff (snapshots.diff): one per signal that's new
+since the previous candle date. Each sink keeps its own queue in cache/alerts_state.json:
+
+  pending    events not delivered yet; retried on the next run until they expire
+  delivered  event IDs already sent, so a rerun on the same day sends nothing twice
+  sent_at    send times, for the max_per_hour limit
+
+Every sink sends from its own background thread, so a slow webhook or SMTP
+server never holds up the report; the run waits up to wait_seconds at the end,
+and the process doesn't exit until a batch already being sent has finished.
+
+    python alerts.py status          pending / delivered counts per sink
+    python alerts.py test            send one sample event through every sink
+"""
+import argparse
+import json
+import os
+import smtplib
+import threading
+import time
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+
+STATE_FILE = os.path.join("cache", "alerts_state.json")
+PENDING_DAYS = 3        # undelivered events older than this are dropped
+DELIVERED_DAYS = 30     # how long delivered IDs are remembered
+
+ICONS = {"Top": "🔺", "Bot": "🟢"}
+
+
+def events_from_changes(as_of, changes, details, signals=("DM9", "DM13")):
+    """One event per new signal of the given kinds, e.g. "1D DM9 Bot" for AAPL."""
+    events = []
+    for name, kinds in changes.items():
+        timeframe, signal, side = name.split(" ")
+        if signal not in signals:
+            continue
+        for ticker in kinds["new"]:
+            events.append({
+                "id": f"{as_of}:{name}:{ticker}",
+                "as_of": as_of,
+                "timeframe": timeframe,
+                "signal": f"{signal} {side}",
+                "ticker": ticker,
+                **details.get((name, ticker), {}),
+            })
+    return events
+
+
+def format_text(batch):
+    lines = []
+    for e in batch:
+        close = f" @ {e['close']:.2f}" if isinstance(e.get("close"), (int, float)) else ""
+        industry = f" ({e['industry']})" if e.get("industry") else ""
+        lines.append(f"{ICONS.get(e['signal'].split()[-1], '•')} [{e['timeframe']}] {e['ticker']} "
+                     f"{e['signal']}{close}{industry}")
+    return "\n".join(lines)
+
+
+def subject(batch):
+    return f"DeMark: {len(batch)} new signal{'s' if len(batch) != 1 else ''} ({batch[0]['as_of']})"
+
+
+class WebhookSink:
+    """POSTs {"text", "events"} as JSON (Slack-style incoming webhooks read "text")."""
+
+    def __init__(self, url=None, url_env=None, timeout=10, name=None):
+        self.url = url or os.environ.get(url_env or "", "")
+        self.timeout = timeout
+        self.name = name or "webhook"
+
+    def send(self, batch):
+        if not self.url:
+            raise RuntimeError("no webhook URL configured")
+        from http_session import get_session
+        response = get_session().post(self.url, json={"text": f"{subject(batch)}\n{format_text(batch)}",
+                                                       "events": batch}, timeout=self.timeout)
+        response.raise_for_status()
+
+
+class SmtpSink:
+    """One plain-text email per batch; the password is read from password_env, never the config."""
+
+    def __init__(self, host, sender, recipients, port=587, username=None, password_env=None,
+                 starttls=True, timeout=20, name=None):
+        self.host, self.port, self.sender = host, port, sender
+        self.recipients = [recipients] if isinstance(recipients, str) else list(recipients)
+        self.username, self.password_env = username, password_env
+        self.starttls, self.timeout = starttls, timeout
+        self.name = name or "smtp"
+
+    def send(self, batch):
+        message = EmailMessage()
+        message["Subject"] = subject(batch)
+        message["From"] = self.sender
+        message["To"] = ", ".join(self.recipients)
+        message.set_content(format_text(batch))
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as server:
+            if self.starttls:
+                server.starttls()
+            if self.username:
+                server.login(self.username, os.environ.get(self.password_env or "", ""))
+            server.send_message(message)
+
+
+class FileSink:
+    """Appends one JSON line per batch: a local queue another process can tail."""
+
+    def __init__(self, path=os.path.join("cache", "alerts.jsonl"), name=None):
+        self.path = path
+        self.name = name or "file"
+
+    def send(self, batch):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"sent": datetime.utcnow().isoformat(timespec="seconds"), "events": batch}) + "\n")
+
+
+class MemorySink:
+    """Keeps batches in memory instead of sending them; the stand-in for trying out a setup."""
+
+    def __init__(self, name=None, delay_seconds=0, fail=False):
+        self.name = name or "memory"
+        self.delay_seconds = delay_seconds
+        self.fail = fail
+        self.batches = []
+
+    def send(self, batch):
+        time.sleep(self.delay_seconds)
+        if self.fail:
+            raise RuntimeError("memory sink set to fail")
+        self.batches.append(batch)
+
+
+SINK_TYPES = {"webhook": WebhookSink, "smtp": SmtpSink, "file": FileSink, "memory": MemorySink}
+
+
+def build_sinks(specs):
+    sinks = []
+    for i, spec in enumerate(specs):
+        options = {k: v for k, v in spec.items() if k != "type"}
+        options.setdefault("name", f"{spec['type']}{i}" if i else spec["type"])
+        sinks.append(SINK_TYPES[spec["type"]](**options))
+    return sinks
+
+
+def load_state(path=STATE_FILE):
+    if not os.path.exists(path):
+        return {"sinks": {}}
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        print(f"⚠️ Ignoring unreadable alert state {path}")
+        return {"sinks": {}}
+
+
+def save_state(state, path=STATE_FILE):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f, indent=0, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def _prune(entry, now):
+    # Forget old deliveries and give up on events that are too stale to be worth sending
+    delivered_cutoff = (now - timedelta(days=DELIVERED_DAYS)).isoformat()
+    pending_cutoff = (now - timedelta(days=PENDING_DAYS)).date().isoformat()
+    hour_ago = (now - timedelta(hours=1)).isoformat()
+    entry["delivered"] = {k: t for k, t in entry["delivered"].items() if t >= delivered_cutoff}
+    entry["pending"] = [e for e in entry["pending"] if e["as_of"] >= pending_cutoff]
+    entry["sent_at"] = [t for t in entry["sent_at"] if t >= hour_ago]
+
+
+class AlertDispatcher:
+    """Queues events per sink and sends them in batches from one background thread per sink."""
+
+    def __init__(self, sinks, batch_size=20, max_per_hour=100, pause_seconds=1.0, state_path=STATE_FILE):
+        self.sinks = sinks
+        self.batch_size = max(1, batch_size)
+        self.max_per_hour = max_per_hour
+        self.pause_seconds = pause_seconds
+        self.state_path = state_path
+        self.state = load_state(state_path)
+        self.lock = threading.Lock()
+        self.threads = []
+        self.summary = {}
+
+    def _entry(self, sink):
+        entry = self.state["sinks"].setdefault(sink.name, {})
+        for key, empty in (("pending", []), ("delivered", {}), ("sent_at", [])):
+            entry.setdefault(key, empty)
+        return entry
+
+    def dispatch(self, events, now=None):
+        now = now or datetime.utcnow()
+        with self.lock:
+            for sink in self.sinks:
+                entry = self._entry(sink)
+                _prune(entry, now)
+                queued = {e["id"] for e in entry["pending"]}
+                entry["pending"] += [e for e in events
+                                     if e["id"] not in entry["delivered"] and e["id"] not in queued]
+                self.summary[sink.name] = {"sent": 0, "pending": len(entry["pending"]), "error": None}
+        for sink in self.sinks:
+            # Not daemon threads: a send still running when the run ends is finished (the sinks
+            # have their own timeouts) and saves its acknowledgement, instead of being killed mid-batch
+            thread = threading.Thread(target=self._run, args=(sink,), name=f"alerts-{sink.name}")
+            thread.start()
+            self.threads.append(thread)
+        return self
+
+    def _run(self, sink):
+        with self.lock:
+            entry = self._entry(sink)
+            budget = max(0, self.max_per_hour - len(entry["sent_at"])) if self.max_per_hour else len(entry["pending"])
+            todo = list(entry["pending"][:budget])
+        for start in range(0, len(todo), self.batch_size):
+            batch = todo[start:start + self.batch_size]
+            if start:
+                time.sleep(self.pause_seconds)
+            try:
+                sink.send(batch)
+            except Exception as e:
+                # Leave the rest queued for the next run
+                with self.lock:
+                    self.summary[sink.name]["error"] = str(e)
+                return
+            sent = datetime.utcnow().isoformat(timespec="seconds")
+            ids = {e["id"] for e in batch}
+            with self.lock:
+                entry["pending"] = [e for e in entry["pending"] if e["id"] not in ids]
+                entry["delivered"].update({i: sent for i in ids})
+                entry["sent_at"] += [sent] * len(batch)
+                self.summary[sink.name]["sent"] += len(batch)
+                self.summary[sink.name]["pending"] = len(entry["pending"])
+                # Persist the acknowledgement now: a sink still sending when wait() gives
+                # up would otherwise have its delivered batches queued again next run
+                save_state(self.state, self.state_path)
+
+    def wait(self, timeout=30):
+        """Join the sink threads (up to timeout seconds in total), save state, return the summary.
+
+        Every state write happens under the lock, and each sink saves after every batch
+        it delivers, so a sink that finishes after this save still records its batches.
+        """
+        deadline = time.time() + timeout
+        for thread in self.threads:
+            thread.join(max(0, deadline - time.time()))
+        with self.lock:
+            for thread, sink in zip(self.threads, self.sinks):
+                if thread.is_alive():
+                    self.summary[sink.name]["error"] = f"still sending after {timeout}s"
+            save_state(self.state, self.state_path)
+            return {name: dict(row) for name, row in self.summary.items()}
+
+
+def print_summary(summary):
+    for name, row in summary.items():
+        note = f" ⚠️ {row['error']}" if row["error"] else ""
+        print(f"📣 Alerts [{name}]: {row['sent']} sent, {row['pending']} queued{note}")
+
+
+def main(argv=None):
+    import scan_config
+
+    parser = argparse.ArgumentParser(description="Inspect or test the signal alert sinks")
+    parser.add_argument("command", choices=["status", "test"])
+    parser.add_argument("--config", default=scan_config.CONFIG_FILE)
+    args = parser.parse_args(argv)
+
+    alerts = scan_config.load_config(args.config)["alerts"]
+    sinks = build_sinks(alerts["sinks"])
+    if args.command == "status":
+        state = load_state()
+        for sink in sinks:
+            entry = state["sinks"].get(sink.name, {})
+            print(f"{sink.name}: {len(entry.get('pending', []))} pending, "
+                  f"{len(entry.get('delivered', {}))} delivered")
+        return 0
+
+    sample = {"id": f"test:{time.time():.0f}", "as_of": datetime.utcnow().date().isoformat(), "timeframe": "1D",
+              "signal": "DM9 Bot", "ticker": "TEST", "close": 100.0, "industry": "Test"}
+    failed = 0
+    for sink in sinks:
+        try:
+            sink.send([sample])
+            print(f"✅ {sink.name}: sent")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {sink.name}: {e}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,107 @@
+"""Adaptive batch sizing for the yahooquery fetch loop.
+
+Batch size grows additively while batches come back fast and clean, and is
+halved after an error or a slow batch (AIMD, like TCP congestion control).
+A batch that raises is split in half recursively so one bad symbol only costs
+itself, not its 49 neighbours.
+"""
+import csv
+import os
+import time
+from collections import defaultdict
+from datetime import datetime
+
+BATCH_LOG_FILE = os.path.join("cache", "batch_log.csv")
+BATCH_LOG_MAX_ROWS = 5000   # the log is committed with cache/, so only the most recent rows are kept
+
+
+class AdaptiveBatcher:
+    def __init__(self, initial=50, min_size=5, max_size=250, step=10,
+                 target_seconds=20.0, max_rows=60000, label=""):
+        self.size = initial
+        self.min_size = min_size
+        self.max_size = max_size
+        self.step = step
+        self.target_seconds = target_seconds  # a batch slower than this shrinks the next one
+        self.max_rows = max_rows              # cap on bars per batch response (payload size)
+        self.label = label
+        self.log = []  # (size, seconds, rows, missing, error)
+
+    def record(self, size, seconds, rows=0, missing=0, error=False):
+        self.log.append((size, seconds, rows, missing, error))
+        if error or seconds > self.target_seconds:
+            self.size = max(self.min_size, self.size // 2)
+            return
+
+        # Fast and clean: grow, but never past the payload cap
+        self.size = min(self.max_size, self.size + self.step)
+        if rows and size:
+            rows_per_symbol = rows / size
+            self.size = min(self.size, max(self.min_size, int(self.max_rows / rows_per_symbol)))
+
+    def fetch(self, batch, fetch_fn):
+        """Run fetch_fn(batch), splitting on failure. Returns ([(sub_batch, result)], failed_symbols)."""
+        started = time.perf_counter()
+        try:
+            result = fetch_fn(batch)
+        except Exception as e:
+            self.record(len(batch), time.perf_counter() - started, error=True)
+            if len(batch) == 1:
+                print(f"⚠️ [{self.label}] {batch[0]} failed on its own: {e}")
+                return [], list(batch)
+            print(f"⚠️ [{self.label}] Batch of {len(batch)} failed ({e}), splitting in half")
+            mid = len(batch) // 2
+            left_ok, left_failed = self.fetch(batch[:mid], fetch_fn)
+            right_ok, right_failed = self.fetch(batch[mid:], fetch_fn)
+            return left_ok + right_ok, left_failed + right_failed
+
+        rows, missing = _measure(result, batch)
+        self.record(len(batch), time.perf_counter() - started, rows=rows, missing=missing)
+        return [(batch, result)], []
+
+    def summary(self):
+        by_size = defaultdict(lambda: [0, 0.0, 0, 0])  # batches, seconds, symbols, errors
+        for size, seconds, _, _, error in self.log:
+            row = by_size[size]
+            row[0] += 1
+            row[1] += seconds
+            row[2] += 0 if error else size
+            row[3] += int(error)
+        return dict(sorted(by_size.items()))
+
+    def print_summary(self):
+        if not self.log:
+            return
+        total_seconds = sum(entry[1] for entry in self.log)
+        total_symbols = sum(entry[0] for entry in self.log if not entry[4])
+        print(f"📦 [{self.label}] {len(self.log)} batches, {total_symbols} symbols in {total_seconds:.1f}s "
+              f"({total_symbols / max(total_seconds, 1e-9):.1f} symbols/s), final size {self.size}")
+        for size, (batches, seconds, symbols, errors) in self.summary().items():
+            print(f"   size {size:>4}: {batches:>3} batches, {symbols / max(seconds, 1e-9):6.1f} symbols/s"
+                  + (f", {errors} errors" if errors else ""))
+
+    def write_log(self, path=BATCH_LOG_FILE, max_rows=BATCH_LOG_MAX_ROWS):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        run_at = datetime.utcnow().isoformat(timespec="seconds")
+        rows = []
+        if os.path.exists(path):
+            with open(path, newline="") as f:
+                rows = list(csv.reader(f))[1:]
+        rows += [[run_at, self.label, size, f"{seconds:.3f}", bars, missing, int(error)]
+                 for size, seconds, bars, missing, error in self.log]
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["run_at", "label", "size", "seconds", "rows", "missing", "error"])
+            writer.writerows(rows[-max_rows:])
+        os.replace(tmp, path)
+
+
+def _measure(result, batch):
+    # Bars returned and symbols with no data, for the sizing heuristics and the log
+    rows = len(result) if hasattr(result, "__len__") and not isinstance(result, dict) else 0
+    try:
+        returned = set(result.index.get_level_values(0))
+    except (AttributeError, IndexError, KeyError):
+        returned = set()
+    return rows, len(set(batch) - returned)
@@ -0,0 +1,79 @@
+"""Parity check and benchmark: batched DeMark kernels vs compute_dm_counts.
+
+    python bench_dm_kernels.py                 # 3000 tickers x 130 bars
+    python bench_dm_kernels.py --tickers 20000 --bars 260
+
+Exits non-zero if any engine disagrees with the reference implementation.
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import dm_kernels
+from main import compute_dm_counts
+
+
+def make_universe(n_tickers, bars, seed=7):
+    rng = np.random.default_rng(seed)
+    series = []
+    for _ in range(n_tickers):
+        length = int(rng.integers(5, bars + 1)) if rng.random() < 0.05 else bars  # a few short series
+        closes = 50 * np.exp(np.cumsum(rng.normal(0, 0.02, length)))
+        if rng.random() < 0.1:
+            closes = np.round(closes, 1)  # ties, so neither count advances
+        if rng.random() < 0.02:
+            closes[rng.integers(0, length)] = np.nan
+        series.append(closes)
+    return series
+
+
+def timed(fn, *args, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - started)
+    return result, best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tickers", type=int, default=3000)
+    parser.add_argument("--bars", type=int, default=130)
+    args = parser.parse_args(argv)
+
+    series = make_universe(args.tickers, args.bars)
+    frames = [pd.DataFrame({"close": s}) for s in series]
+
+    def reference(frames):
+        counts = [compute_dm_counts(df) for df in frames]
+        return (np.array([c[0] for c in counts], dtype=np.int32),
+                np.array([c[1] for c in counts], dtype=np.int32))
+
+    expected, ref_seconds = timed(reference, frames, repeat=1)
+    print(f"reference (per-ticker Python)  {ref_seconds * 1000:9.1f} ms")
+
+    engines = ["numpy"] + (["numba"] if dm_kernels.NUMBA_AVAILABLE else [])
+    if not dm_kernels.NUMBA_AVAILABLE:
+        print("numba not installed, skipping the JIT engine")
+    if "numba" in engines:
+        dm_kernels.last_counts(*dm_kernels.pack_series(series[:1]), engine="numba")  # compile outside the timing
+
+    failed = False
+    for engine in engines:
+        (values, offsets), pack_seconds = timed(dm_kernels.pack_series, series)
+        (up, dn), seconds = timed(dm_kernels.last_counts, values, offsets, engine)
+        mismatches = np.flatnonzero((up != expected[0]) | (dn != expected[1]))
+        status = "OK" if len(mismatches) == 0 else f"{len(mismatches)} MISMATCHES (first: {mismatches[:5].tolist()})"
+        failed |= len(mismatches) > 0
+        print(f"{engine:<30} {seconds * 1000:9.1f} ms  (+{pack_seconds * 1000:.1f} ms pack)  "
+              f"{ref_seconds / max(seconds, 1e-9):7.1f}x  {status}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
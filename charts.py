@@ -0,0 +1,193 @@
+"""Report charts, drawn with matplotlib or the dependency-free SVG backend.
+
+matplotlib is imported inside the matplotlib drawing functions only, so an SVG
+run never loads it. ChartRenderer can draw in a worker process while the scan
+keeps going; wait() collects every chart before the HTML is written.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import pandas as pd
+import pytz
+
+import svg_charts
+
+BACKENDS = ("matplotlib", "svg")
+
+
+def chart_path(name, backend):
+    return f"docs/{name}.{'svg' if backend == 'svg' else 'png'}"
+
+
+def plot_sector_trends(sector_totals, backend="matplotlib", out_path=None):
+    # sector_totals: {sector: (daily signals, weekly signals)}
+    out_path = out_path or chart_path("sector_trends", backend)
+    sectors = sorted(sector_totals)
+    daily_counts = [sector_totals[s][0] for s in sectors]
+    weekly_counts = [sector_totals[s][1] for s in sectors]
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+
+    if backend == "svg":
+        svg_charts.horizontal_bars(sectors, [("Daily", "lightcoral", daily_counts),
+                                             ("Weekly", "skyblue", weekly_counts)],
+                                   "Sector Signal Trends: Daily vs Weekly", "Number of Signals", out_path)
+    else:
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+
+        x = range(len(sectors))
+        width = 0.35
+
+        plt.figure(figsize=(14, 8))
+        plt.barh([i - width/2 for i in x], daily_counts, height=width, label="Daily", color="lightcoral")
+        plt.barh([i + width/2 for i in x], weekly_counts, height=width, label="Weekly", color="skyblue")
+        plt.yticks(x, sectors)
+        plt.xlabel("Number of Signals")
+        plt.title("Sector Signal Trends: Daily vs Weekly")
+        plt.legend()
+        plt.tight_layout()
+        plt.savefig(out_path, bbox_inches="tight")
+        plt.close()
+
+    if os.path.exists(out_path):
+        print(f"✅ {os.path.basename(out_path)} exists.")
+        return out_path
+    print(f"❌ Failed to save {os.path.basename(out_path)}.")
+    return None
+
+
+def plot_sector_history(series, timeframe="1D", days=60, backend="matplotlib", out_path=None):
+    # Time series of daily signal counts per sector, from signal_store.sector_series
+    out_path = out_path or chart_path("sector_history", backend)
+    try:
+        dates = sorted({d for points in series.values() for d in points})
+        if len(dates) < 2:
+            return None
+        title = f"Signals per Sector ({timeframe}, last {days} days)"
+        os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+
+        if backend == "svg":
+            lines = [(sector, svg_charts.PALETTE[i % len(svg_charts.PALETTE)],
+                      [points.get(d, 0) for d in dates])
+                     for i, (sector, points) in enumerate(sorted(series.items()))]
+            labels = [pd.Timestamp(d).strftime("%b %d") for d in dates]
+            svg_charts.line_chart(labels, lines, title, "Number of Signals", out_path,
+                                  width=1100, height=480, markers=True)
+        else:
+            import matplotlib
+            matplotlib.use("Agg")
+            import matplotlib.dates as mdates
+            import matplotlib.pyplot as plt
+
+            x = pd.to_datetime(dates)
+            plt.figure(figsize=(14, 6))
+            for sector, points in sorted(series.items()):
+                plt.plot(x, [points.get(d, 0) for d in dates], marker="o", markersize=3, label=sector)
+            plt.title(title)
+            plt.ylabel("Number of Signals")
+            plt.gca().xaxis.set_major_formatter(mdates.DateFormatter("%b %d"))
+            plt.gcf().autofmt_xdate(rotation=45)
+            plt.legend(fontsize="small", ncol=2)
+            plt.tight_layout()
+            plt.savefig(out_path, bbox_inches="tight")
+            plt.close()
+
+        return out_path if os.path.exists(out_path) else None
+    except Exception as e:
+        print(f"⚠️ Could not plot sector history: {e}")
+        return None
+
+
+def plot_fear_greed_trend(csv_path="fear_and_greed_history.csv", backend="matplotlib",
+                          out_path=None, lookback_days=120):
+    out_path = out_path or chart_path("fg_trend", backend)
+    try:
+        if not os.path.exists(csv_path):
+            return None
+
+        df = pd.read_csv(csv_path)
+        if df.empty or "Date" not in df.columns or "Index" not in df.columns:
+            return None
+
+        # Make Date UTC-aware for safe comparisons
+        df["Date"] = pd.to_datetime(df["Date"], utc=True, errors="coerce")
+        df = df.dropna(subset=["Date", "Index"]).sort_values("Date")
+
+        # Use UTC-aware cutoff
+        cutoff = pd.Timestamp.now(tz=pytz.UTC) - pd.Timedelta(days=lookback_days)
+        df = df[df["Date"] >= cutoff]
+        if df.empty:
+            return None
+
+        # For plotting, remove tz info (matplotlib is happier with naive)
+        df_plot = df.copy()
+        df_plot["Date"] = df_plot["Date"].dt.tz_localize(None)
+        os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+
+        if backend == "svg":
+            svg_charts.line_chart(df_plot["Date"].dt.strftime("%b %d").tolist(),
+                                  [("Index", svg_charts.PALETTE[0], df_plot["Index"].astype(float).tolist())],
+                                  "CNN Fear & Greed (last ~120 days)", "Index", out_path)
+        else:
+            import matplotlib
+            matplotlib.use("Agg")
+            import matplotlib.dates as mdates
+            import matplotlib.pyplot as plt
+
+            plt.figure(figsize=(9, 4.4))
+            plt.plot(df_plot["Date"], df_plot["Index"])
+            plt.title("CNN Fear & Greed (last ~120 days)")
+            plt.xlabel("Date")
+            plt.ylabel("Index")
+            plt.gca().xaxis.set_major_formatter(mdates.DateFormatter("%b %d"))
+            plt.gcf().autofmt_xdate(rotation=45)
+            plt.tight_layout()
+            plt.savefig(out_path, bbox_inches="tight")
+            plt.close()
+
+        return out_path if os.path.exists(out_path) else None
+    except Exception as e:
+        print(f"⚠️ Could not plot Fear & Greed trend: {e}")
+        return None
+
+
+class ChartRenderer:
+    """Runs chart functions inline, or in one worker process when background is set."""
+
+    def __init__(self, backend="matplotlib", background=False):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown chart backend {backend!r}, expected one of {', '.join(BACKENDS)}")
+        self.backend = backend
+        self.pool = None
+        if background:
+            # spawn: a forked child would inherit the HTTP sessions and sampler threads
+            self.pool = ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn"))
+        self.jobs = {}
+
+    def submit(self, name, fn, *args, inline=False, **kwargs):
+        # inline draws here even with a worker: for charts whose inputs only exist once
+        # the scans are done, there's nothing left to overlap with and the hop costs more
+        kwargs["backend"] = self.backend
+        if self.pool is None or inline:
+            self.jobs[name] = fn(*args, **kwargs)
+        else:
+            self.jobs[name] = self.pool.submit(fn, *args, **kwargs)
+
+    def wait(self):
+        """{name: output path or None} for every submitted chart."""
+        paths = {}
+        for name, job in self.jobs.items():
+            if hasattr(job, "result"):
+                try:
+                    job = job.result()
+                except Exception as e:
+                    print(f"⚠️ Chart {name} failed in the background: {e}")
+                    job = None
+            paths[name] = job
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+        self.jobs = {}
+        return paths
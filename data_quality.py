@@ -0,0 +1,109 @@
+"""Vectorized data-quality checks over the packed price arrays, run before the counts.
+
+Per ticker, over all bars at once:
+
+  duplicate_dates  the same day twice (repairable: keep the last copy)
+  out_of_order     day numbers going backwards
+  bad_close        zero, negative or NaN closes (repairable: drop the bar)
+  jump             close-to-close move beyond max_jump x, typically a split
+                   the provider hasn't adjusted for yet
+  stale            last bar older than the last completed session (or week)
+  bad_last_bar     a bad close on the bar being scanned, which no repair can replace
+
+Repairable issues are fixed when repair is on; anything else excludes the
+ticker from the scan, since a bad bar can create or hide a 9/13 count.
+"""
+import csv
+import os
+
+import numpy as np
+
+ISSUES = ("duplicate_dates", "out_of_order", "bad_close", "jump", "stale", "bad_last_bar")
+REPAIRABLE = {"duplicate_dates", "bad_close"}
+MAX_JUMP = 3.0
+REPORT_DIR = "cache"
+
+
+def _per_ticker(bar_mask, segment, n):
+    return np.bincount(segment[bar_mask], minlength=n) > 0
+
+
+def validate(values, days, offsets, expected_day, max_jump=MAX_JUMP):
+    """Flag issues per ticker and mark the bars a repair would drop.
+
+    Returns ({issue: bool array per ticker}, drop_bar bool array over the packed bars).
+    """
+    n = len(offsets) - 1
+    lengths = np.diff(offsets)
+    segment = np.repeat(np.arange(n), lengths)
+    first = np.zeros(len(values), dtype=bool)
+    first[offsets[:-1][lengths > 0]] = True
+
+    step = np.ones(len(days), dtype=np.int64)
+    step[1:] = np.diff(days.astype(np.int64))
+    duplicate = (step == 0) & ~first
+    # Keep the last copy of a duplicated day: drop the bar a duplicate follows
+    duplicate_drop = np.zeros(len(values), dtype=bool)
+    duplicate_drop[:-1] = duplicate[1:]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        bad = ~(values > 0)
+        ratio = np.ones(len(values))
+        ratio[1:] = values[1:] / values[:-1]
+        good_pair = ~bad
+        good_pair[1:] &= ~bad[:-1]
+        jump = good_pair & ~first & ((ratio > max_jump) | (ratio < 1.0 / max_jump))
+
+    issues = {
+        "duplicate_dates": _per_ticker(duplicate, segment, n),
+        "out_of_order": _per_ticker((step < 0) & ~first, segment, n),
+        "bad_close": _per_ticker(bad, segment, n),
+        "jump": _per_ticker(jump, segment, n),
+        "stale": np.zeros(n, dtype=bool),
+        "bad_last_bar": np.zeros(n, dtype=bool),
+    }
+    has_bars = lengths > 0
+    last = offsets[1:][has_bars] - 1
+    issues["stale"][has_bars] = days[last] < expected_day
+    issues["bad_last_bar"][has_bars] = bad[last]
+    return issues, duplicate_drop | bad
+
+
+def plan(issues, repair=True):
+    """(exclude, repaired) per ticker from the flags returned by validate."""
+    flagged = np.zeros_like(issues["stale"])
+    fatal = np.zeros_like(flagged)
+    for name, mask in issues.items():
+        flagged |= mask
+        if name not in REPAIRABLE or not repair:
+            fatal |= mask
+    return fatal, flagged & ~fatal
+
+
+def compact(keep_bar, offsets, keep_ticker, *arrays):
+    """Drop bars and whole tickers from packed arrays; returns (new offsets, *arrays)."""
+    n = len(offsets) - 1
+    segment = np.repeat(np.arange(n), np.diff(offsets))
+    keep_bar = keep_bar & keep_ticker[segment]
+    lengths = np.bincount(segment[keep_bar], minlength=n)[keep_ticker]
+    new_offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=new_offsets[1:])
+    return (new_offsets,) + tuple(a[keep_bar] for a in arrays)
+
+
+def report_rows(tickers, issues, exclude, repaired):
+    rows = []
+    for i in np.flatnonzero(exclude | repaired):
+        found = [name for name in ISSUES if issues[name][i]]
+        rows.append((tickers[i], " ".join(found), "excluded" if exclude[i] else "repaired"))
+    return rows
+
+
+def write_report(cache_key, rows, directory=REPORT_DIR):
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"quality_{cache_key}.csv")
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["ticker", "issues", "action"])
+        writer.writerows(sorted(rows))
+    return path
@@ -0,0 +1,84 @@
+"""Negative cache for tickers that come back from Yahoo with no price data.
+
+Each miss is logged with a timestamp. From MIN_MISSES consecutive misses on, the
+ticker is skipped for an exponentially growing backoff window, then probed again;
+a single hit clears its record.
+"""
+import json
+import os
+from datetime import datetime, timedelta
+
+MISSES_FILE = os.path.join("cache", "ticker_misses.json")
+
+MIN_MISSES = 2          # misses before a ticker starts being skipped
+BASE_BACKOFF_DAYS = 1   # first skip window, doubled on every further miss
+MAX_BACKOFF_DAYS = 30
+
+
+def load_misses(path=MISSES_FILE):
+    if not os.path.exists(path):
+        return {"tickers": {}, "requests_saved": 0}
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        print(f"⚠️ Ignoring unreadable miss log {path}")
+        return {"tickers": {}, "requests_saved": 0}
+    if "tickers" not in data:
+        # older flat {ticker: entry} layout
+        data = {"tickers": data, "requests_saved": 0}
+    return data
+
+
+def save_misses(misses, path=MISSES_FILE):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(misses, f, indent=0, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def backoff_days(miss_count, min_misses=MIN_MISSES, base_days=BASE_BACKOFF_DAYS, max_days=MAX_BACKOFF_DAYS):
+    if miss_count < min_misses:
+        return 0
+    return min(base_days * 2 ** (miss_count - min_misses), max_days)
+
+
+def record_fetch_results(misses, requested, returned, now=None, **backoff):
+    # A hit clears the streak; a miss extends it and pushes the next retry further out
+    now = now or datetime.utcnow()
+    tickers = misses["tickers"]
+    for ticker in requested:
+        if ticker in returned:
+            tickers.pop(ticker, None)
+        else:
+            entry = tickers.setdefault(ticker, {"misses": 0})
+            entry["misses"] += 1
+            entry["last_miss"] = now.isoformat(timespec="seconds")
+            days = backoff_days(entry["misses"], **backoff)
+            entry["skip_until"] = (now + timedelta(days=days)).isoformat(timespec="seconds") if days else None
+    return misses
+
+
+def partition(tickers, misses, now=None):
+    """Split tickers into (to_fetch, skipped) according to their backoff windows."""
+    now = (now or datetime.utcnow()).isoformat(timespec="seconds")
+    entries = misses["tickers"]
+    to_fetch, skipped = [], []
+    for ticker in tickers:
+        skip_until = entries.get(ticker, {}).get("skip_until")
+        (skipped if skip_until and skip_until > now else to_fetch).append(ticker)
+    return to_fetch, skipped
+
+
+def report_skipped(misses, label, skipped, batch_size):
+    misses["requests_saved"] = misses.get("requests_saved", 0) + len(skipped)
+    if skipped:
+        batches = -(-len(skipped) // batch_size)
+        print(f"🚫 [{label}] Skipped {len(skipped)} known-dead tickers "
+              f"(saved {len(skipped)} requests, ~{batches} batches; "
+              f"{misses['requests_saved']} saved all-time)")
+
+
+def dead_tickers(misses, max_misses):
+    return {ticker for ticker, entry in misses["tickers"].items() if entry["misses"] >= max_misses}
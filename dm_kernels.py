@@ -0,0 +1,125 @@
+"""Batched DeMark setup-count kernels over a packed array of every ticker's closes.
+
+All series are concatenated into one float64 array; offsets[i]:offsets[i + 1]
+is ticker i's slice. The counts match compute_dm_counts in main.py bar for bar:
+a count runs while close > close 4 bars back (or < for the down count) and
+resets to 0 otherwise, and a series shorter than MIN_BARS reports 0.
+
+numba is optional: when it's installed the sequential kernel is JIT-compiled,
+otherwise the vectorized NumPy path is used.
+"""
+import numpy as np
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+MIN_BARS = 20
+LOOKBACK = 4
+ENGINE = "auto"   # engine used when callers don't pick one; "numpy", "numba" or "auto"
+
+
+def pack_series(arrays):
+    """Concatenate 1-D arrays into (values, offsets)."""
+    lengths = np.fromiter((len(a) for a in arrays), dtype=np.int64, count=len(arrays))
+    offsets = np.zeros(len(arrays) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    values = np.concatenate(arrays).astype(np.float64, copy=False) if arrays else np.empty(0)
+    return values, offsets
+
+
+def _run_lengths(condition, is_start_region):
+    # Length of the current run of True ending at each position; False or the
+    # first LOOKBACK bars of a series reset it to 0
+    idx = np.arange(len(condition))
+    breaks = np.where(condition & ~is_start_region, -1, idx)
+    last_break = np.maximum.accumulate(breaks) if len(breaks) else breaks
+    return idx - last_break
+
+
+def count_series_numpy(values, offsets):
+    """Full per-bar (up, down) counts for every packed series."""
+    n = len(values)
+    prev = np.full(n, np.nan)
+    if n > LOOKBACK:
+        prev[LOOKBACK:] = values[:-LOOKBACK]
+
+    # Bars whose 4-back comparison would cross into the previous ticker
+    local_index = np.arange(n) - np.repeat(offsets[:-1], np.diff(offsets))
+    start_region = local_index < LOOKBACK
+
+    with np.errstate(invalid="ignore"):
+        up = _run_lengths(values > prev, start_region)
+        dn = _run_lengths(values < prev, start_region)
+    return up.astype(np.int32), dn.astype(np.int32)
+
+
+def last_bar_counts(up, dn, offsets):
+    """Last-bar (up, down) counts from full per-bar counts, 0 for series under MIN_BARS."""
+    ends = offsets[1:] - 1
+    lengths = np.diff(offsets)
+    valid = lengths >= MIN_BARS
+    last_up = np.zeros(len(lengths), dtype=np.int32)
+    last_dn = np.zeros(len(lengths), dtype=np.int32)
+    last_up[valid] = up[ends[valid]]
+    last_dn[valid] = dn[ends[valid]]
+    return last_up, last_dn
+
+
+def last_counts_numpy(values, offsets):
+    up, dn = count_series_numpy(values, offsets)
+    return last_bar_counts(up, dn, offsets)
+
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def _count_series_numba(values, offsets, up, dn):
+        for t in range(len(offsets) - 1):
+            start, end = offsets[t], offsets[t + 1]
+            for i in range(start, end):
+                if i - start < LOOKBACK:
+                    up[i] = 0
+                    dn[i] = 0
+                    continue
+                up[i] = up[i - 1] + 1 if values[i] > values[i - LOOKBACK] else 0
+                dn[i] = dn[i - 1] + 1 if values[i] < values[i - LOOKBACK] else 0
+
+    def count_series_numba(values, offsets):
+        up = np.empty(len(values), dtype=np.int32)
+        dn = np.empty(len(values), dtype=np.int32)
+        _count_series_numba(values, offsets, up, dn)
+        return up, dn
+
+    def last_counts_numba(values, offsets):
+        up, dn = count_series_numba(values, offsets)
+        return last_bar_counts(up, dn, offsets)
+
+
+def min_exact_bars(up, dn, floor=MIN_BARS):
+    """Bars each ticker needs for its last-bar counts to come out the same.
+
+    A run of c counts ending on the last bar needs those c bars, the bar that
+    broke the previous run, and LOOKBACK bars before that for the comparison.
+    Series shorter than MIN_BARS report 0, so never go below the floor.
+    """
+    return np.maximum(floor, np.maximum(up, dn).astype(np.int64) + LOOKBACK + 1)
+
+
+def _use_numba(engine):
+    engine = engine or ENGINE
+    return engine == "numba" or (engine == "auto" and NUMBA_AVAILABLE)
+
+
+def count_series(values, offsets, engine=None):
+    if _use_numba(engine):
+        return count_series_numba(values, offsets)
+    return count_series_numpy(values, offsets)
+
+
+def last_counts(values, offsets, engine=None):
+    """Last-bar (up, down) counts per ticker, one call for the whole universe."""
+    if _use_numba(engine):
+        return last_counts_numba(values, offsets)
+    return last_counts_numpy(values, offsets)
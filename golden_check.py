@@ -0,0 +1,330 @@
+"""Golden-file regression check: every signal engine against frozen fixtures and recorded outputs.
+
+    python golden_check.py                    # every engine, a few seconds
+    python golden_check.py --engine numba     # just one (repeatable)
+    python golden_check.py --record           # after an intended change, re-record expected.json
+    python golden_check.py --regenerate       # rebuild the fixtures themselves, then record
+
+golden/ holds 300 tickers from sp_cache.csv (with their sectors and industries)
+and synthetic but real-looking daily and weekly bars on NYSE sessions: prices
+in cents, a few IPO-length histories, tick-size ties, missing prints and
+planted 7-13 bar runs. expected.json has the per-ticker counts from
+compute_dm_counts plus the Tops, Bottoms, Watch rows and sector/industry
+aggregates scan_timeframe produced when it was recorded.
+
+Engines checked: the per-ticker reference, the numpy and numba kernels, the
+incremental window (recounting only the min_exact_bars tail, as a short
+fetch would), and the whole scan_timeframe pipeline on each kernel, sharded
+and not. A few hand-built edge cases (e.g. a series with no volume at all) are
+checked on every run as well. Exits non-zero on any mismatch.
+"""
+import argparse
+import contextlib
+import csv
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+import dm_kernels
+import market_calendar
+import symbols
+from main import compute_dm_counts, drop_illiquid, fetch_tickers_and_sectors_from_csv, scan_series, scan_timeframe
+
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden")
+UNIVERSE_FILE = os.path.join(GOLDEN_DIR, "universe.csv")
+EXPECTED_FILE = os.path.join(GOLDEN_DIR, "expected.json")
+TIMEFRAMES = {"1D": ("1d", 130), "1W": ("1wk", 104)}   # label: (interval, bars)
+AS_OF = date(2025, 6, 27)
+N_TICKERS = 300
+SEED = 50
+MISSING = -1   # stored in place of a missing print, read back as NaN
+
+ENGINES = ["reference", "numpy", "numba", "incremental", "scan-numpy", "scan-numba", "scan-sharded"]
+
+
+def fixture_path(label):
+    return os.path.join(GOLDEN_DIR, f"prices_{label}.npz")
+
+
+# --- Fixture generation (only with --regenerate) -------------------------------------------
+
+def _bar_dates(interval, count):
+    if interval == "1wk":
+        monday = AS_OF - timedelta(days=AS_OF.weekday())
+        return [monday - timedelta(weeks=i) for i in range(count)][::-1]
+    days, day = [], AS_OF
+    while len(days) < count:
+        if market_calendar.is_trading_day(day):
+            days.append(day)
+        day -= timedelta(days=1)
+    return days[::-1]
+
+
+def _make_series(rng, bars, weekly):
+    length = bars if rng.random() > 0.05 else int(rng.integers(8, 60))   # recent listings
+    vol = rng.uniform(0.008, 0.035) * (2.2 if weekly else 1.0)
+    returns = rng.normal(rng.normal(0, vol / 8), vol, length)
+    if rng.random() < 0.25:
+        # A clean run into (or just short of) a 9 or 13 on the last bar
+        run = min(int(rng.choice([7, 8, 9, 11, 12, 13])), length)
+        returns[-run:] = rng.choice([-1, 1]) * np.abs(rng.normal(vol, vol / 3, run))
+    close = np.exp(rng.uniform(np.log(3), np.log(400))) * np.exp(np.cumsum(returns))
+    tick = 10 if close[-1] < 10 and rng.random() < 0.5 else 1   # coarse ticks make ties
+    cents = np.maximum(np.round(close * 100 / tick) * tick, 1).astype(np.int64)
+    spread = np.abs(rng.normal(0, vol / 2, length))
+    high = np.round(cents * (1 + spread)).astype(np.int64)
+    low = np.round(cents * (1 - spread)).astype(np.int64)
+    volume = rng.lognormal(13, 1.2, length).astype(np.int64)
+    if rng.random() < 0.02:
+        cents[rng.integers(0, length)] = MISSING
+    return cents, high, low, volume
+
+
+def regenerate():
+    rng = np.random.default_rng(SEED)
+    with open(os.path.join(os.path.dirname(GOLDEN_DIR), "sp_cache.csv"), newline="") as f:
+        rows = [r for r in csv.DictReader(f) if r.get("Ticker")]
+    picked = sorted((rows[i] for i in rng.choice(len(rows), N_TICKERS, replace=False)),
+                    key=lambda r: r["Ticker"])
+    os.makedirs(GOLDEN_DIR, exist_ok=True)
+    with open(UNIVERSE_FILE, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["Ticker", "Sector", "Industry"], extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(picked)
+
+    for label, (interval, bars) in TIMEFRAMES.items():
+        dates = _bar_dates(interval, bars)
+        columns = {"close": [], "high": [], "low": [], "volume": [], "day": []}
+        for _ in picked:
+            series = _make_series(rng, bars, interval == "1wk")
+            for key, values in zip(("close", "high", "low", "volume"), series):
+                columns[key].append(values)
+            columns["day"].append(np.array([market_calendar.day_number(d) for d in dates[-len(series[0]):]],
+                                           dtype=np.int32))
+        offsets = dm_kernels.pack_series(columns["close"])[1]
+        np.savez_compressed(fixture_path(label), tickers=np.array([r["Ticker"] for r in picked]),
+                            offsets=offsets, **{k: np.concatenate(v) for k, v in columns.items()})
+    print(f"🧊 Wrote {N_TICKERS}-ticker fixtures to {GOLDEN_DIR}")
+
+
+# --- Loading ---------------------------------------------------------------------------------
+
+def load_fixture(label):
+    """{ticker: frame} shaped like main.normalize_bars output: lowercase columns, int day index."""
+    with np.load(fixture_path(label)) as data:
+        arrays = {k: data[k] for k in data.files}
+    prices = {}
+    for key in ("close", "high", "low"):
+        prices[key] = np.where(arrays[key] == MISSING, np.nan, arrays[key] / 100.0)
+    frames = {}
+    offsets = arrays["offsets"]
+    for i, ticker in enumerate(arrays["tickers"].tolist()):
+        s = slice(offsets[i], offsets[i + 1])
+        frames[ticker] = pd.DataFrame({"close": prices["close"][s], "high": prices["high"][s],
+                                       "low": prices["low"][s], "volume": arrays["volume"][s].astype(float)},
+                                      index=pd.Index(arrays["day"][s], name="day"))
+    return frames
+
+
+# --- Engines ---------------------------------------------------------------------------------
+
+def _packed(frames):
+    tickers = list(frames)
+    values, offsets = dm_kernels.pack_series([frames[t]["close"].to_numpy() for t in tickers])
+    return tickers, values, offsets
+
+
+def counts_reference(frames):
+    return {t: tuple(int(c) for c in compute_dm_counts(df)) for t, df in frames.items()}
+
+
+def counts_kernel(frames, engine):
+    tickers, values, offsets = _packed(frames)
+    up, dn = dm_kernels.last_counts(values, offsets, engine)
+    return {t: (int(u), int(d)) for t, u, d in zip(tickers, up, dn)}
+
+
+def counts_incremental(frames):
+    # What a short-window fetch sees: only the last min_exact_bars bars of each series
+    tickers, values, offsets = _packed(frames)
+    up, dn = dm_kernels.last_counts(values, offsets)
+    keep = dm_kernels.min_exact_bars(up, dn)
+    tails = [frames[t]["close"].to_numpy()[-k:] for t, k in zip(tickers, keep)]
+    up, dn = dm_kernels.last_counts(*dm_kernels.pack_series(tails))
+    return {t: (int(u), int(d)) for t, u, d in zip(tickers, up, dn)}
+
+
+def run_scan(label, frames, sector_map, industry_map, engine="auto", shard_size=0):
+    """scan_timeframe on the fixtures, in a scratch directory so nothing lands in cache/."""
+    interval = TIMEFRAMES[label][0]
+    table = symbols.SymbolTable()
+
+    def loader(shard, *args, **kwargs):
+        return {t: frames[t] for t in shard if t in frames}
+
+    previous_engine, cwd = dm_kernels.ENGINE, os.getcwd()
+    dm_kernels.ENGINE = engine
+    try:
+        with tempfile.TemporaryDirectory() as scratch, contextlib.redirect_stdout(io.StringIO()):
+            os.chdir(scratch)
+            results, sectors, _ = scan_timeframe(sector_map, industry_map, label, interval, table,
+                                                 cache_key=f"golden_{label}", memory={"shard_size": shard_size},
+                                                 price_loader=loader)
+    finally:
+        os.chdir(cwd)
+        dm_kernels.ENGINE = previous_engine
+
+    counts = results["Counts"]
+    return {
+        "counts": {t: (int(u), int(d)) for t, u, d in zip(table.decode("ticker", counts["ids"]),
+                                                          counts["up"], counts["dn"])},
+        "Tops": results["Tops"], "Bottoms": results["Bottoms"], "Watch": results["Watch"],
+        "sectors": {key: sectors[key] for key in ("Tops", "Bottoms", "Breadth", "Industry")},
+    }
+
+
+# --- Edge cases ------------------------------------------------------------------------------
+
+def check_unknown_volume():
+    # No volume prints at all is unknown liquidity, not zero: ADV stays NaN and the
+    # liquidity filter keeps the name. A few missing prints just drop out of the mean
+    closes = 50 + np.arange(30.0)
+    volume = {"NOVOL": np.full(30, np.nan), "GAPPY": np.where(np.arange(30) % 3, 1e6, np.nan)}
+    series = {"tickers": list(volume), "close": [closes] * 2, "high": [closes] * 2, "low": [closes] * 2,
+              "volume": list(volume.values()), "day": [np.arange(30)] * 2, "last_close": [closes[-1]] * 2}
+    adv = dict(zip(volume, scan_series(series, "1d")["adv"]))
+    problems = []
+    if not np.isnan(adv["NOVOL"]):
+        problems.append(f"all-NaN volume gave ADV {adv['NOVOL']}, expected NaN")
+    expected = np.nanmean(closes[-20:] * volume["GAPPY"][-20:])
+    if not np.isclose(adv["GAPPY"], expected):
+        problems.append(f"partly missing volume gave ADV {adv['GAPPY']:.0f}, expected {expected:.0f}")
+    results = {"Tops": [("NOVOL", 79.0, "DM9 Top", "Test")], "Bottoms": [], "Watch": [],
+               "Rank": {"NOVOL": {"adv": float(adv["NOVOL"])}}}
+    if drop_illiquid(results, 2_000_000)[1]:
+        problems.append("drop_illiquid hid a name with unknown volume")
+    return problems
+
+
+EDGE_CASES = {"unknown-volume": check_unknown_volume}
+
+
+# --- Comparison ------------------------------------------------------------------------------
+
+def _plain(value):
+    # JSON-shaped copy with floats rounded, so recorded and fresh outputs compare exactly
+    if isinstance(value, dict):
+        return {str(k): _plain(v) for k, v in sorted(value.items())}
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    if isinstance(value, (float, np.floating)):
+        return None if np.isnan(value) else round(float(value), 6)
+    if isinstance(value, np.integer):
+        return int(value)
+    return value
+
+
+def _diff_counts(expected, actual):
+    bad = [t for t in expected if tuple(expected[t]) != tuple(actual.get(t, (None, None)))]
+    extra = sorted(set(actual) - set(expected))
+    problems = [f"{t}: expected {tuple(expected[t])}, got {tuple(actual[t]) if t in actual else None}"
+                for t in bad[:5]]
+    if extra:
+        problems.append(f"unexpected tickers: {extra[:5]}")
+    if len(bad) > 5:
+        problems.append(f"... {len(bad) - 5} more")
+    return problems
+
+
+def _diff_scan(expected, actual):
+    problems = _diff_counts(expected["counts"], actual["counts"])
+    for key in ("Tops", "Bottoms", "Watch", "sectors"):
+        if _plain(actual[key]) != expected[key]:
+            problems.append(f"{key} differs from the recorded output")
+    return problems
+
+
+def check_engine(engine, label, frames, maps, expected):
+    if engine == "reference":
+        return _diff_counts(expected["counts"], counts_reference(frames))
+    if engine in ("numpy", "numba"):
+        return _diff_counts(expected["counts"], counts_kernel(frames, engine))
+    if engine == "incremental":
+        return _diff_counts(expected["counts"], counts_incremental(frames))
+    kernel = {"scan-numpy": "numpy", "scan-numba": "numba", "scan-sharded": "auto"}[engine]
+    return _diff_scan(expected, _plain(run_scan(label, frames, *maps, engine=kernel,
+                                                shard_size=64 if engine == "scan-sharded" else 0)))
+
+
+def record(fixtures, maps):
+    expected = {}
+    for label, frames in fixtures.items():
+        reference = counts_reference(frames)
+        scan = _plain(run_scan(label, frames, *maps, engine="numpy"))
+        problems = _diff_counts(_plain(reference), scan["counts"])
+        if problems:
+            print(f"❌ [{label}] scan_timeframe disagrees with compute_dm_counts, not recording:")
+            for p in problems:
+                print(f"   {p}")
+            return 1
+        expected[label] = {**scan, "counts": _plain(reference)}
+        signals = len(scan["Tops"]) + len(scan["Bottoms"])
+        print(f"📼 [{label}] {len(reference)} tickers, {signals} signals, {len(scan['Watch'])} watchlist rows")
+    with open(EXPECTED_FILE, "w", encoding="utf-8") as f:
+        json.dump(expected, f, indent=0, sort_keys=True)
+    print(f"💾 Recorded {EXPECTED_FILE}")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--engine", action="append", choices=ENGINES, help="engine to check (repeatable)")
+    parser.add_argument("--record", action="store_true", help="re-record expected.json from the reference engine")
+    parser.add_argument("--regenerate", action="store_true", help="rebuild the fixtures, then record")
+    args = parser.parse_args(argv)
+
+    if args.regenerate:
+        regenerate()
+    with contextlib.redirect_stdout(io.StringIO()):
+        maps = fetch_tickers_and_sectors_from_csv(UNIVERSE_FILE)
+    fixtures = {label: load_fixture(label) for label in TIMEFRAMES}
+    if args.record or args.regenerate:
+        return record(fixtures, maps)
+
+    with open(EXPECTED_FILE, encoding="utf-8") as f:
+        expected = json.load(f)
+    engines = args.engine or ENGINES
+    if not dm_kernels.NUMBA_AVAILABLE and any("numba" in e for e in engines):
+        print("numba not installed, skipping the JIT engines")
+        engines = [e for e in engines if "numba" not in e]
+
+    failed = False
+    for engine in engines:
+        for label, frames in fixtures.items():
+            started = time.perf_counter()
+            problems = check_engine(engine, label, frames, maps, expected[label])
+            seconds = time.perf_counter() - started
+            failed |= bool(problems)
+            print(f"{engine:<14} {label:<3} {seconds * 1000:8.1f} ms  {'OK' if not problems else 'FAIL'}")
+            for p in problems:
+                print(f"    {p}")
+    for name, check in EDGE_CASES.items():
+        started = time.perf_counter()
+        problems = check()
+        seconds = time.perf_counter() - started
+        failed |= bool(problems)
+        print(f"{name:<18} {seconds * 1000:8.1f} ms  {'OK' if not problems else 'FAIL'}")
+        for p in problems:
+            print(f"    {p}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
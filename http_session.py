@@ -0,0 +1,229 @@
+"""Shared HTTP session layer with keep-alive pooling and an on-disk response cache."""
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlencode, urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+HTTP_CACHE_DIR = os.path.join("cache", "http")
+
+# Cache lifetime per endpoint in seconds (first substring match wins, 0 = never cached).
+# Chart bars aren't cached here: price_cache.py and the market calendar decide when
+# bars are stale, and a cached response would undo the refetch they asked for
+ENDPOINT_TTLS = [
+    ("/v10/finance/quoteSummary/", 7 * 24 * 3600),
+    ("dataviz.cnn.io/index/fearandgreed", 3600),
+]
+
+# A crumb only works with the cookies of the session that fetched it, so it's
+# remembered per inner session in memory and never written to disk
+CRUMB_ENDPOINT = "/v1/test/getcrumb"
+
+# Query params that change on every call but don't change the answer
+VOLATILE_PARAMS = {"crumb"}
+
+
+class CachedResponse:
+    """Minimal stand-in for a requests.Response rebuilt from the disk cache."""
+
+    def __init__(self, entry):
+        self.url = entry["url"]
+        self.status_code = entry["status_code"]
+        self.headers = entry["headers"]
+        self.content = entry["content"]
+        self.encoding = entry.get("encoding") or "utf-8"
+        self.from_cache = True
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding, errors="replace")
+
+    def json(self, **kwargs):
+        return json.loads(self.text, **kwargs)
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}")
+
+
+class CachedSession:
+    """Wraps a requests-compatible session with TTL caching, revalidation and latency stats.
+
+    The inner session is created lazily, so a run served entirely from cache
+    never opens a connection (yahooquery's session setup alone costs two requests).
+    Each thread gets its own inner session since curl_cffi sessions aren't thread-safe.
+    """
+
+    def __init__(self, session_factory, cache_dir=HTTP_CACHE_DIR, ttls=None):
+        self._factory = session_factory
+        self._local = threading.local()
+        self.cache_dir = cache_dir
+        self.ttls = ENDPOINT_TTLS if ttls is None else ttls
+        self.stats = []  # (endpoint, source, status, seconds)
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @property
+    def session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = self._factory()
+        return session
+
+    def __getattr__(self, name):
+        # cookies, headers, close() etc. go straight to the real session
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.session, name)
+
+    def ttl_for(self, url):
+        for pattern, ttl in self.ttls:
+            if pattern in url:
+                return ttl
+        return 0
+
+    def _cache_path(self, method, url, params):
+        stable = sorted((k, str(v)) for k, v in (params or {}).items() if k not in VOLATILE_PARAMS)
+        key = f"{method} {url}?{urlencode(stable)}"
+        return os.path.join(self.cache_dir, hashlib.sha1(key.encode()).hexdigest() + ".pkl")
+
+    def _load(self, path):
+        try:
+            with open(path, "rb") as f:
+                return pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+    def _store(self, path, entry):
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(entry, f)
+        os.replace(tmp, path)
+
+    def _record(self, url, source, status, started):
+        parts = urlsplit(url)
+        endpoint = parts.netloc + "/".join(parts.path.split("/")[:4])
+        self.stats.append((endpoint, source, status, time.perf_counter() - started))
+
+    def get(self, url, params=None, **kwargs):
+        return self.request("GET", url, params=params, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def _crumb(self, url, params, headers, kwargs, started):
+        response = getattr(self._local, "crumb", None)
+        if response is not None:
+            self._record(url, "memory", response.status_code, started)
+            return response
+        response = self.session.request("GET", url, params=params, headers=headers, **kwargs)
+        self._record(url, "network", response.status_code, started)
+        if response.status_code == 200:
+            self._local.crumb = response
+        return response
+
+    def request(self, method, url, params=None, headers=None, **kwargs):
+        started = time.perf_counter()
+        if method == "GET" and CRUMB_ENDPOINT in url:
+            return self._crumb(url, params, headers, kwargs, started)
+        ttl = self.ttl_for(url) if method == "GET" else 0
+        if not ttl:
+            response = self.session.request(method, url, params=params, headers=headers, **kwargs)
+            self._record(url, "network", response.status_code, started)
+            return response
+
+        path = self._cache_path(method, url, params)
+        entry = self._load(path)
+        if entry and time.time() - entry["stored_at"] < ttl:
+            self._record(url, "cache", entry["status_code"], started)
+            return CachedResponse(entry)
+
+        # Expired entry: ask the server whether it changed instead of re-downloading
+        headers = dict(headers or {})
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        response = self.session.request(method, url, params=params, headers=headers, **kwargs)
+        if entry and response.status_code == 304:
+            entry["stored_at"] = time.time()
+            self._store(path, entry)
+            self._record(url, "revalidated", 304, started)
+            return CachedResponse(entry)
+
+        self._record(url, "network", response.status_code, started)
+        if response.status_code == 200:
+            self._store(path, {
+                "url": str(response.url),
+                "status_code": response.status_code,
+                "headers": dict(response.headers),
+                "content": response.content,
+                "encoding": response.encoding,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "stored_at": time.time(),
+            })
+        return response
+
+    def latency_summary(self):
+        summary = defaultdict(lambda: {"count": 0, "total": 0.0, "max": 0.0})
+        for endpoint, source, _, seconds in self.stats:
+            row = summary[(endpoint, source)]
+            row["count"] += 1
+            row["total"] += seconds
+            row["max"] = max(row["max"], seconds)
+        return dict(summary)
+
+
+def _pooled_requests_session(pool_size=20):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=2)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def _yahoo_session():
+    # Yahoo needs yahooquery's browser-impersonating session (cookies + crumb)
+    from yahooquery.session_management import initialize_session
+    return initialize_session()
+
+
+_SESSIONS = {}
+_FACTORIES = {
+    "default": _pooled_requests_session,
+    "yahoo": _yahoo_session,
+    # Intraday polling gets its own connections and cookies (and so its own crumb)
+    "yahoo_live": _yahoo_session,
+}
+
+
+def get_session(kind="default"):
+    if kind not in _SESSIONS:
+        _SESSIONS[kind] = CachedSession(_FACTORIES[kind])
+    return _SESSIONS[kind]
+
+
+def print_latency_summary():
+    rows = []
+    for kind, session in _SESSIONS.items():
+        for (endpoint, source), row in session.latency_summary().items():
+            rows.append((kind, endpoint, source, row))
+    if not rows:
+        return
+    print("\n🌐 HTTP latency by endpoint")
+    for kind, endpoint, source, row in sorted(rows):
+        avg_ms = 1000 * row["total"] / row["count"]
+        print(f"   [{kind}] {endpoint:<55} {source:<11} n={row['count']:<5} "
+              f"avg={avg_ms:.0f}ms max={1000 * row['max']:.0f}ms")
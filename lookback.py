@@ -0,0 +1,99 @@
+"""Incremental fetch windows: request only as many bars as the counts need.
+
+After each scan the engine's per-ticker minimum (dm_kernels.min_exact_bars) is
+saved with the candle date it was computed on. On the next run a ticker needs
+that many bars plus however many bars have printed since: if its run kept going
+the run's start is still inside the old window, and if it reset, the new run
+sits inside the new bars. Windows are rounded up to a few buckets so each
+bucket is one batch of identical Yahoo requests. The short fetch is spliced onto
+the cached frames (main.splice_bars), so the price cache keeps its full history.
+
+Yahoo re-adjusts past bars after a split or dividend, which a splice can't see
+beyond its overlap. So a ticker whose overlapping closes moved by more than
+SPLICE_TOLERANCE is refetched in full, and each cache file gets a full refresh
+every FULL_REFRESH_DAYS regardless.
+"""
+import json
+import math
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import numpy as np
+
+LOOKBACK_DIR = "cache"
+MARGIN_BARS = 5          # slack for provider revisions and late prints
+BUCKET_BARS = 10         # round windows up to a multiple of this
+MAX_AGE_DAYS = 21        # older lookback files fall back to the full period
+FULL_REFRESH_DAYS = 7    # refetch the full period at least this often
+SPLICE_TOLERANCE = 0.01  # relative close change at the overlap that means re-adjusted history
+
+
+def _path(cache_key):
+    return os.path.join(LOOKBACK_DIR, f"lookback_{cache_key}.json")
+
+
+def save_lookback(cache_key, interval, as_of, tickers, min_bars):
+    os.makedirs(LOOKBACK_DIR, exist_ok=True)
+    data = {
+        "interval": interval,
+        "as_of": as_of,
+        "bars": {t: int(b) for t, b in zip(tickers, min_bars)},
+    }
+    tmp = _path(cache_key) + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp, _path(cache_key))
+
+
+def load_lookback(cache_key, interval):
+    path = _path(cache_key)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get("interval") != interval:
+        return None
+    return data
+
+
+def bars_since(as_of, interval, today=None):
+    today = (today or datetime.utcnow()).date()
+    as_of = datetime.strptime(as_of, "%Y-%m-%d").date()
+    if interval == "1wk":
+        return (today - as_of).days // 7 + 1
+    return int(np.busday_count(as_of + timedelta(days=1), today + timedelta(days=1)))
+
+
+def window_start(bars, interval, today=None):
+    # Calendar start date that covers `bars` sessions, with room for holidays
+    today = (today or datetime.utcnow()).date()
+    if interval == "1wk":
+        days = 7 * (bars + 1)
+    else:
+        days = math.ceil(bars * 7 / 5) + 7
+    return (today - timedelta(days=days)).strftime("%Y-%m-%d")
+
+
+def plan_windows(tickers, interval, cache_key, today=None):
+    """Group tickers by fetch start date; None means fetch the full period."""
+    groups = defaultdict(list)
+    lookback = load_lookback(cache_key, interval)
+    as_of = lookback and lookback.get("as_of")
+    if not as_of or (datetime.utcnow() - datetime.strptime(as_of, "%Y-%m-%d")).days > MAX_AGE_DAYS:
+        groups[None] = list(tickers)
+        return dict(groups)
+
+    elapsed = bars_since(as_of, interval, today)
+    for ticker in tickers:
+        needed = lookback["bars"].get(ticker)
+        if needed is None:
+            groups[None].append(ticker)
+            continue
+        bars = needed + elapsed + MARGIN_BARS
+        bars = BUCKET_BARS * math.ceil(bars / BUCKET_BARS)
+        groups[window_start(bars, interval, today)].append(ticker)
+    return dict(groups)
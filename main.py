@@ -1,16 +1,33 @@
 import pandas as pd
+import numpy as np
 from datetime import datetime, timedelta
 import os
-import pickle
 from yahooquery import Ticker
-import requests
 import csv
 from collections import defaultdict
 import time
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
-from collections import defaultdict
 import pytz
+from http_session import get_session, print_latency_summary
+import signal_store
+import alerts
+import charts
+import svg_charts
+import dead_tickers
+from batching import AdaptiveBatcher
+import dm_kernels
+import scan_config
+import lookback
+import price_cache
+import ranking
+import data_quality
+import sector_watch
+import shards
+import snapshots
+import stage_profiler
+import symbols
+import market_calendar
+import argparse
+import traceback
 
 
 def fetch_tickers_and_sectors_from_csv(cache_file):
@@ -36,11 +53,12 @@ def fetch_tickers_and_sectors_from_csv(cache_file):
 os.makedirs("cache", exist_ok=True)
 
 
-def compute_dm_signals(df):
+def compute_dm_counts(df):
+    # Up/down setup counts on the last bar; signals and the watchlist both read these
     close = df["close"].values
     length = len(close)
     if length < 20:
-        return False, False, False, False
+        return 0, 0
 
     TD = [0] * length
     TDUp = [0] * length
@@ -61,144 +79,559 @@ def compute_dm_signals(df):
         TDUp[i] = TD[i] - valuewhen_reset(TD, i)
         TDDn[i] = TS[i] - valuewhen_reset(TS, i)
 
-    DM9Top = TDUp[-1] == 9
-    DM13Top = TDUp[-1] == 13
-    DM9Bot = TDDn[-1] == 9
-    DM13Bot = TDDn[-1] == 13
+    return TDUp[-1], TDDn[-1]
 
-    return DM9Top, DM13Top, DM9Bot, DM13Bot
 
+def dm_signals_from_counts(up_count, dn_count):
+    return up_count == 9, up_count == 13, dn_count == 9, dn_count == 13
 
-def is_friday_after_close():
-    eastern = pytz.timezone('US/Eastern')
-    now = datetime.now(eastern)
-    return now.weekday() == 4 and now.time() > datetime.strptime("16:30", "%H:%M").time()
 
+def compute_dm_signals(df):
+    return dm_signals_from_counts(*compute_dm_counts(df))
+
+
+# Counts one or two bars short of a 9 or 13
+WATCH_COUNTS = {7: "DM9", 8: "DM9", 11: "DM13", 12: "DM13"}
+
+
+SIGNAL_NONE, SIGNAL_DM9, SIGNAL_DM13 = 0, 1, 2
+
+
+def encode_categories(keys, mapping, table, kind):
+    # Each key's label as its stable symbol-table code; labels[code] decodes it
+    codes = table.encode(kind, [mapping.get(k, "Unknown") for k in keys])
+    return codes.astype(np.int64), table.names(kind)
+
+
+def aggregate_signals(top_codes, bot_codes, group_codes, labels):
+    # One bincount per side over (group, signal) pairs instead of counting inside the scan loop
+    n = len(labels)
+    scanned = np.bincount(group_codes, minlength=n)
+    tops = np.bincount(group_codes * 3 + top_codes, minlength=n * 3).reshape(n, 3)
+    bots = np.bincount(group_codes * 3 + bot_codes, minlength=n * 3).reshape(n, 3)
+
+    total_tops = tops[:, SIGNAL_DM9] + tops[:, SIGNAL_DM13]
+    total_bots = bots[:, SIGNAL_DM9] + bots[:, SIGNAL_DM13]
+    on_9 = tops[:, SIGNAL_DM9] + bots[:, SIGNAL_DM9]
+    pct_on_9 = np.divide(100.0 * on_9, scanned, out=np.zeros(n), where=scanned > 0)
+
+    breadth = {}
+    for i in np.flatnonzero(scanned):
+        breadth[labels[i]] = {
+            "scanned": int(scanned[i]),
+            "tops": int(total_tops[i]),
+            "bottoms": int(total_bots[i]),
+            "dm9_tops": int(tops[i, SIGNAL_DM9]),
+            "dm13_tops": int(tops[i, SIGNAL_DM13]),
+            "dm9_bottoms": int(bots[i, SIGNAL_DM9]),
+            "dm13_bottoms": int(bots[i, SIGNAL_DM13]),
+            "net": int(total_tops[i] - total_bots[i]),
+            "pct_on_9": float(pct_on_9[i]),
+        }
+    return breadth
+
+
+def aggregate_scan(scanned, top_codes, bot_codes, ticker_sector_map, ticker_industry_map, table=None):
+    table = table or symbols.SymbolTable()
+    top_codes = np.asarray(top_codes, dtype=np.int64)
+    bot_codes = np.asarray(bot_codes, dtype=np.int64)
+    sector_codes, sector_labels = encode_categories(scanned, ticker_sector_map, table, "sector")
+    industry_codes, industry_labels = encode_categories(scanned, ticker_industry_map, table, "industry")
+    breadth = aggregate_signals(top_codes, bot_codes, sector_codes, sector_labels)
+
+    return {
+        "Tops": {sector: row["tops"] for sector, row in breadth.items() if row["tops"]},
+        "Bottoms": {sector: row["bottoms"] for sector, row in breadth.items() if row["bottoms"]},
+        "Breadth": breadth,
+        "Industry": aggregate_signals(top_codes, bot_codes, industry_codes, industry_labels),
+    }
 
-def load_or_fetch_price_data(tickers, interval, period, cache_key):
-    cache_dir = "cache"
-    os.makedirs(cache_dir, exist_ok=True)
-    cache_file = os.path.join(cache_dir, f"price_cache_{cache_key}.pkl")
 
-    # Detect if today is Saturday or Sunday (UTC)
-    weekday = datetime.utcnow().weekday()
-    is_weekend = weekday >= 5
+def last_bar_date(data):
+    # Latest bar date across all tickers, as YYYY-MM-DD
+    last = max((int(df.index[-1]) for df in data.values() if len(df)), default=None)
+    return market_calendar.from_day_number(last).isoformat() if last is not None else None
 
-    if is_weekend and os.path.exists(cache_file):
-        print(f"📦 [Weekend] Using cached data: {cache_file}")
-        with open(cache_file, "rb") as f:
-            return pickle.load(f)
 
-    print(f"🌐 Fetching fresh data for {cache_key}...")
-    all_data = {}
-    batch_size = 50
+def normalize_bars(df):
+    # Ingest: lowercase columns and an int day-number index (New York session dates),
+    # done once when bars arrive instead of on every scan
+    days = pd.Index(market_calendar.session_day_numbers(df.index), name="day")
+    return df.set_axis(days, axis=0).rename(columns=str.lower)
 
-    for i in range(0, len(tickers), batch_size):
-        batch = tickers[i:i + batch_size]
-        t = Ticker(batch)
-        batch_data = t.history(interval=interval, period=period)
 
-        if isinstance(batch_data, pd.DataFrame):
-            for ticker in batch:
-                if (ticker,) in batch_data.index:
-                    all_data[ticker] = batch_data.xs(ticker, level=0)
-        else:
-            print(f"⚠️ Unexpected format in batch {batch}: {type(batch_data)}")
+def cached_frames(cache_file, interval):
+    # Whatever the price cache holds, stale or not, for short windows to be spliced onto
+    if not os.path.exists(cache_file):
+        return {}
+    try:
+        return price_cache.load_price_cache(cache_file, interval)[1]
+    except price_cache.CacheError as e:
+        print(f"⚠️ Ignoring unusable cache, fetching full history: {e}")
+        return {}
+
+
+def splice_bars(old, new):
+    # Short-window bars on top of the cached history, keeping the cached length so
+    # sparklines and ranking features still see the whole window. If the new bars
+    # don't reach back to the cached ones there's a gap, so only the new bars are kept.
+    # None when the overlapping closes disagree: Yahoo has re-adjusted the history
+    # (split or dividend) and the cached bars need refetching in full
+    if old is None or not len(old) or not len(new) or new.index[0] > old.index[-1]:
+        return new
+    # The last cached bar may have been fetched mid-session, so it isn't compared
+    settled = old["close"].iloc[:-1]
+    settled = settled[~settled.index.duplicated(keep="last")]
+    fresh = new["close"][~new.index.duplicated(keep="last")]
+    overlap = settled.index.intersection(fresh.index)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        drift = np.abs(fresh.loc[overlap].to_numpy() / settled.loc[overlap].to_numpy() - 1)
+    if np.any(drift > lookback.SPLICE_TOLERANCE):
+        return None
+    merged = pd.concat([old[old.index < new.index[0]], new])
+    return merged.iloc[-max(len(old), len(new)):]
+
 
-        time.sleep(1.5)
+def last_full_refresh(cache_file, interval):
+    # Date the cache file last had every ticker fetched over the full period, or None
+    try:
+        return price_cache.read_header(cache_file, interval).get("full_refresh")
+    except price_cache.CacheError:
+        return None
+
+
+# Price data already fetched in this process, per (interval, period), so profiles run
+# together share one fetch: {"data": {ticker: df}, "tried": set of tickers}
+_FETCHED = {}
+# Tickers whose no-data miss has been counted this cycle; the Sector and 1D fetches are
+# both daily, and a ticker in both universes must not be counted twice
+_MISS_COUNTED = set()
+
+
+def reset_fetch_memo():
+    _FETCHED.clear()
+    _MISS_COUNTED.clear()
 
-    with open(cache_file, "wb") as f:
-        pickle.dump(all_data, f)
+
+def load_or_fetch_price_data(tickers, interval, period, cache_key, batch_size=50, sleep_seconds=1.5,
+                             lookback_key=None, remember=True, live=False):
+    cache_dir = "cache"
+    os.makedirs(cache_dir, exist_ok=True)
+    cache_file = os.path.join(cache_dir, f"price_cache_{cache_key}.pkl")
+
+    # Reuse the cache if it already holds the last completed session (or week) per the
+    # NYSE calendar: covers weekends, holidays and manual reruns after the close. Live
+    # (intraday) profiles want today's bar as it forms, so they always refetch
+    if os.path.exists(cache_file) and not live:
+        try:
+            header = price_cache.read_header(cache_file, interval)
+            covers = set(tickers) <= set(header.get("requested", ()))
+            if covers and market_calendar.is_cache_fresh(header["created_at"], header.get("last_bar"), interval):
+                header, cached = price_cache.load_price_cache(cache_file, interval)
+                print(f"📦 Using cached data: {cache_file} "
+                      f"(bars to {header['last_bar']}, written {header['created_at']} UTC)")
+                return {t: cached[t] for t in tickers if t in cached}
+        except price_cache.CacheError as e:
+            print(f"⚠️ Ignoring unusable cache, refetching: {e}")
+
+    # Sharded scans skip the memo: holding every shard's frames is what they avoid
+    memo = _FETCHED.setdefault((interval, period, live), {"data": {}, "tried": set()}) if remember else \
+        {"data": {}, "tried": set()}
+    requested = tickers
+    tickers = [t for t in tickers if t not in memo["tried"]]
+    if len(tickers) < len(requested):
+        print(f"♻️ [{cache_key}] {len(requested) - len(tickers)} tickers already fetched this run")
+
+    if tickers:
+        print(f"🌐 Fetching fresh data for {cache_key}...")
+    all_data = {}
+    batcher = AdaptiveBatcher(initial=batch_size, label=cache_key)
+
+    # Skip tickers still inside their no-data backoff window
+    misses = dead_tickers.load_misses()
+    tickers, skipped = dead_tickers.partition(tickers, misses)
+    dead_tickers.report_skipped(misses, cache_key, skipped, batcher.size)
+    answered = []  # tickers from batches Yahoo actually responded to
+
+    # Incremental runs only ask for the bars the counts need (see lookback.py)
+    windows = lookback.plan_windows(tickers, interval, lookback_key or cache_key)
+    # Short windows are spliced onto the cached history, so tickers without any get the full
+    # period; so does everything once the last full refresh is FULL_REFRESH_DAYS old
+    full_refresh = last_full_refresh(cache_file, interval)
+    history = {}
+    if any(windows):
+        age = (datetime.utcnow() - datetime.strptime(full_refresh, "%Y-%m-%d")).days if full_refresh else None
+        if age is None or age >= lookback.FULL_REFRESH_DAYS:
+            print(f"🔄 [{cache_key}] Full refresh (last one {full_refresh or 'not recorded'}) "
+                  f"to pick up split and dividend adjustments")
+            windows = {None: list(tickers)}
+        else:
+            history = cached_frames(cache_file, interval)
+            regrouped = defaultdict(list)
+            for start, group in windows.items():
+                for ticker in group:
+                    regrouped[start if ticker in history else None].append(ticker)
+            windows = dict(regrouped)
+    if tickers and not any(windows):
+        full_refresh = datetime.utcnow().strftime("%Y-%m-%d")
+    if None not in windows or len(windows[None]) < len(tickers):
+        shortened = len(tickers) - len(windows.get(None, []))
+        print(f"✂️ [{cache_key}] {shortened} tickers fetched with a short window "
+              f"({len(windows)} window sizes)")
+
+    def fetch_window(start, group):
+        # Fetch one window's tickers; returns the ones whose cached history Yahoo has re-adjusted
+        def fetch_history(batch):
+            t = Ticker(batch, session=get_session("yahoo_live" if live else "yahoo"))
+            if start:
+                return t.history(interval=interval, start=start)
+            return t.history(interval=interval, period=period)
+
+        readjusted = []
+        i = 0
+        while i < len(group):
+            batch = group[i:i + batcher.size]
+            i += len(batch)
+
+            fetched, _ = batcher.fetch(batch, fetch_history)
+            for sub_batch, batch_data in fetched:
+                if isinstance(batch_data, pd.DataFrame):
+                    for ticker in sub_batch:
+                        if (ticker,) in batch_data.index:
+                            bars = normalize_bars(batch_data.xs(ticker, level=0))
+                            if start:
+                                bars = splice_bars(history.get(ticker), bars)
+                                if bars is None:
+                                    readjusted.append(ticker)
+                                    continue
+                            all_data[ticker] = bars
+                    # symbols Yahoo had no data for are just missing from the frame
+                    answered.extend(sub_batch)
+                else:
+                    print(f"⚠️ Unexpected format in batch {sub_batch}: {type(batch_data)}")
+
+            time.sleep(sleep_seconds)
+        return readjusted
+
+    readjusted = []
+    for start, group in sorted(windows.items(), key=lambda x: x[0] or ""):
+        readjusted += fetch_window(start, group)
+    if readjusted:
+        print(f"🔁 [{cache_key}] {len(readjusted)} tickers re-adjusted since they were cached "
+              f"(split or dividend), refetching their full period")
+        fetch_window(None, readjusted)
+
+    del history
+    batcher.print_summary()
+    batcher.write_log()
+
+    # Track consecutive no-data runs (nightly daily fetches only, each ticker once per run)
+    if interval == "1d" and not live:
+        uncounted = [t for t in dict.fromkeys(answered) if t not in _MISS_COUNTED]
+        dead_tickers.record_fetch_results(misses, uncounted, all_data)
+        _MISS_COUNTED.update(uncounted)
+    dead_tickers.save_misses(misses)
+
+    memo["data"].update(all_data)
+    memo["tried"].update(tickers)
+    all_data = {t: memo["data"][t] for t in requested if t in memo["data"]}
+
+    price_cache.write_price_cache(cache_file, all_data, interval, period, cache_key,
+                                  extra={"last_bar": last_bar_date(all_data), "requested": sorted(requested),
+                                         "full_refresh": full_refresh})
 
     print(f"💾 Saved fresh data to cache: {cache_file}")
     return all_data
 
 
-def scan_timeframe(ticker_sector_map, ticker_industry_map, interval_label, interval):
-    results = {"Tops": [], "Bottoms": []}
-    sector_counts = {"Tops": defaultdict(int), "Bottoms": defaultdict(int)}
-    tickers = list(ticker_sector_map.keys())
-    print(f"\n🔍 Scanning {len(tickers)} tickers on {interval_label} timeframe...")
+def register_universe(table, sector_maps, industry_maps):
+    # Give every ticker, sector and industry of this run its code up front, then persist
+    # the table once so nothing later in the run can assign a code that isn't saved
+    table.encode("ticker", sorted(set().union(*sector_maps)))
+    table.encode("sector", sorted({v for m in sector_maps for v in m.values()} | {"Unknown"}))
+    table.encode("industry", sorted({v for m in industry_maps for v in m.values()} | {"Unknown"}))
+    if table.save():
+        print(f"🔢 Symbol table {table.path}: {len(table.names('ticker'))} tickers, "
+              f"{len(table.names('sector'))} sectors, {len(table.names('industry'))} industries")
+
 
-    period = '2y' if interval == '1wk' else '6mo'
-    price_data = load_or_fetch_price_data(tickers, interval, period, interval_label)
+def prepare_series(price_data, interval, interval_label):
+    # Per-ticker prep: drop the in-progress weekly bar and keep just the arrays the kernels need.
+    # Frames are indexed by int day number since ingest, so this is plain integer work
+    series = {"tickers": [], "close": [], "high": [], "low": [], "volume": [], "day": [], "last_close": []}
+    last_days = []
+    completed_week = None
+    if interval == '1wk':
+        completed_week = market_calendar.day_number(market_calendar.last_completed_week()[0])
 
-    candle_date = None
     for ticker, df in price_data.items():
         try:
             if df.empty:
                 continue
 
-            df = df.reset_index()
-            df.columns = [c.lower() for c in df.columns]
-
-            last_close = float(df['close'].iloc[-1])
-
-            if interval == '1wk':
-                last_date = pd.to_datetime(df['date'].iloc[-1])
-                if getattr(last_date, "tzinfo", None) is not None:
-                    # make naive for consistent comparisons/formatting
-                    try:
-                        last_date = last_date.tz_convert(None)
-                    except Exception:
-                        last_date = last_date.tz_localize(None)
-
-                # drop in-progress week if present
-                today = datetime.utcnow()
-                start_of_week = today - timedelta(days=today.weekday())  # Monday UTC
-                if last_date >= start_of_week and len(df) > 1:
-                    df = df.iloc[:-1]
-
-                # set candle_date to last fully completed weekly bar
-                if not candle_date and not df.empty:
-                    candle_date = pd.to_datetime(df['date'].iloc[-1])
-                    if getattr(candle_date, "tzinfo", None) is not None:
-                        try:
-                            candle_date = candle_date.tz_convert(None)
-                        except Exception:
-                            candle_date = candle_date.tz_localize(None)
-                    candle_date = candle_date.strftime("%Y-%m-%d")
+            days = df.index.to_numpy()
+            close = df["close"].to_numpy(dtype=float)
+            last_close = float(close[-1])
+
+            # drop in-progress week if present
+            keep = len(df)
+            if completed_week is not None and days[-1] > completed_week and keep > 1:
+                keep -= 1
+
+            series["tickers"].append(ticker)
+            series["close"].append(close[:keep])
+            series["high"].append(df["high"].to_numpy(dtype=float)[:keep] if "high" in df else close[:keep])
+            series["low"].append(df["low"].to_numpy(dtype=float)[:keep] if "low" in df else close[:keep])
+            series["volume"].append(df["volume"].to_numpy(dtype=float)[:keep] if "volume" in df
+                                    else np.full(keep, np.nan))
+            series["day"].append(days[:keep])
+            series["last_close"].append(last_close)
+            last_days.append(days[keep - 1])
 
-            else:
-                # DAILY: set candle_date from the last completed daily bar
-                if not candle_date and not df.empty:
-                    last_date = pd.to_datetime(df['date'].iloc[-1])
-                    if getattr(last_date, "tzinfo", None) is not None:
-                        try:
-                            last_date = last_date.tz_convert(None)
-                        except Exception:
-                            last_date = last_date.tz_localize(None)
-                    candle_date = last_date.strftime("%Y-%m-%d")
-
-            DM9Top, DM13Top, DM9Bot, DM13Bot = compute_dm_signals(df)
-            sector = ticker_sector_map.get(ticker, "Unknown")
-            if interval_label == "Sector":
-                industry = ticker_sector_map.get(ticker, "Unknown")  # use Sector as Industry for sector ETFs
-            else:
-                industry = ticker_industry_map.get(ticker, "Unknown")
+        except Exception as e:
+            print(f"⚠️ Skipping {ticker} [{interval_label}] due to error: {e}")
 
-            if DM9Top or DM13Top:
-                signal = "DM13 Top" if DM13Top else "DM9 Top"
-                results["Tops"].append((ticker, last_close, signal, industry))
-                sector_counts["Tops"][sector] += 1
+    # Last completed bar (daily session or weekly bar) across the shard
+    candle_date = market_calendar.from_day_number(max(last_days)).isoformat() if last_days else None
+    return series, candle_date
+
+
+def scan_series(series, interval, quality=None, sparkline_bars=0):
+    # Counts and ranking features for one shard, reduced to a few numbers per ticker
+    # so the shard's price arrays can be released before the next one is loaded.
+    # One kernel call for the whole shard instead of a Python recurrence per ticker
+    values, offsets = dm_kernels.pack_series(series["close"])
+    highs = dm_kernels.pack_series(series["high"])[0]
+    lows = dm_kernels.pack_series(series["low"])[0]
+    volumes = dm_kernels.pack_series(series["volume"])[0]
+    tickers, last_closes = series["tickers"], np.array(series["last_close"], dtype=float)
+
+    # Validate before counting: repair what can be repaired, drop series that can't be trusted
+    quality_rows = []
+    if quality:
+        issues, drop_bar = data_quality.validate(values, dm_kernels.pack_series(series["day"])[0], offsets,
+                                                 quality["expected_day"], quality["max_jump"])
+        exclude, repaired = data_quality.plan(issues, quality["repair"])
+        quality_rows = data_quality.report_rows(tickers, issues, exclude, repaired)
+        if quality_rows:
+            offsets, values, highs, lows, volumes = data_quality.compact(
+                ~drop_bar if quality["repair"] else np.ones(len(values), dtype=bool),
+                offsets, ~exclude, values, highs, lows, volumes)
+            tickers = [t for t, bad in zip(tickers, exclude) if not bad]
+            last_closes = last_closes[~exclude]
+
+    up_series, dn_series = dm_kernels.count_series(values, offsets)
+    up_counts, dn_counts = dm_kernels.last_bar_counts(up_series, dn_series, offsets)
+    flagged = np.flatnonzero((up_counts == 9) | (up_counts == 13) | (dn_counts == 9) | (dn_counts == 13)
+                             | np.isin(up_counts, list(WATCH_COUNTS)) | np.isin(dn_counts, list(WATCH_COUNTS)))
+
+    # Ranking features over the same packed arrays: liquidity, N-bar return, TDST distance
+    dollar_volume = values * volumes
+    tdst = np.full(len(up_counts), np.nan)
+    tdst[flagged] = ranking.tdst_distance(values, highs, lows, offsets,
+                                          np.maximum(up_counts, dn_counts)[flagged],
+                                          up_counts[flagged] > 0, flagged)
+
+    # Sparklines for the report rows, drawn from the same arrays while they're still in memory
+    spark = {}
+    if sparkline_bars:
+        spark = dict(zip([tickers[i] for i in flagged],
+                         svg_charts.sparklines(values, up_series, dn_series, offsets, flagged, sparkline_bars)))
+    return {
+        "tickers": tickers,
+        "last_close": last_closes,
+        "quality": quality_rows,
+        "up": up_counts,
+        "dn": dn_counts,
+        "adv": ranking.tail_mean(dollar_volume, offsets) / (5 if interval == "1wk" else 1),  # per trading day
+        "ret": ranking.tail_return(values, offsets),
+        "tdst": tdst,
+        "spark": spark,
+        "bars": int(np.diff(offsets).max()) if len(offsets) > 1 else 0,
+    }
 
-            if DM9Bot or DM13Bot:
-                signal = "DM13 Bot" if DM13Bot else "DM9 Bot"
-                results["Bottoms"].append((ticker, last_close, signal, industry))
-                sector_counts["Bottoms"][sector] += 1
 
-        except Exception as e:
-            print(f"⚠️ Skipping {ticker} [{interval_label}] due to error: {e}")
+def combine_scans(parts):
+    combined = {"tickers": [t for part in parts for t in part["tickers"]],
+                "quality": [row for part in parts for row in part["quality"]],
+                "spark": {ticker: svg for part in parts for ticker, svg in part["spark"].items()},
+                "bars": max((part["bars"] for part in parts), default=0)}
+    for key in ("last_close", "up", "dn", "adv", "ret", "tdst"):
+        combined[key] = np.concatenate([part[key] for part in parts]) if parts else np.empty(0)
+    combined["up"] = combined["up"].astype(np.int32)
+    combined["dn"] = combined["dn"].astype(np.int32)
+    return combined
+
+
+def scan_timeframe(ticker_sector_map, ticker_industry_map, interval_label, interval, table=None,
+                   period=None, fetch_options=None, cache_key=None, benchmarks=None, memory=None,
+                   quality=None, sparkline_bars=0, price_loader=None):
+    table = table or symbols.SymbolTable()
+    results = {"Tops": [], "Bottoms": [], "Watch": [], "Rank": {}}
+    tickers = list(ticker_sector_map.keys())
+    print(f"\n🔍 Scanning {len(tickers)} tickers on {interval_label} timeframe...")
+
+    period = period or ('2y' if interval == '1wk' else '6mo')
+    cache_key = cache_key or interval_label
+
+    # Shards are fetched (or read from their own cache file), scanned and released one
+    # at a time; with no shard_size the whole universe is one shard, as before
+    memory = memory or {}
+    planner = shards.ShardPlanner(memory.get("shard_size") or max(len(tickers), 1),
+                                  memory.get("max_rss_mb"), label=interval_label)
+    sharded = planner.size < len(tickers)
+    parts, candle_date = [], None
+
+    # Data-quality checks compare each series' last bar with the last completed session/week
+    if quality and quality.get("enabled", True):
+        quality = {**quality, "expected_day": market_calendar.day_number(market_calendar.expected_last_bar(interval)[0])}
+    else:
+        quality = None
+
+    # price_loader stands in for the Yahoo fetch, e.g. golden_check.py serving frozen fixtures
+    load = price_loader or load_or_fetch_price_data
+    for n, shard in enumerate(planner.shards(tickers)):
+        with stage_profiler.stage("fetch"):
+            price_data = load(shard, interval, period, f"{cache_key}_part{n}" if sharded else cache_key,
+                              lookback_key=cache_key, remember=not sharded, **(fetch_options or {}))
+        with stage_profiler.stage("scan"):
+            series, shard_date = prepare_series(price_data, interval, interval_label)
+            del price_data
+            candle_date = max(filter(None, (candle_date, shard_date)), default=None)
+            parts.append(scan_series(series, interval, quality, sparkline_bars))
+            del series
+
+    scan = combine_scans(parts)
+    if quality:
+        path = data_quality.write_report(cache_key, scan["quality"])
+        excluded = sum(1 for row in scan["quality"] if row[2] == "excluded")
+        if scan["quality"]:
+            print(f"🩺 [{interval_label}] Data quality: {len(scan['quality']) - excluded} series repaired, "
+                  f"{excluded} excluded (see {path})")
+    scanned, last_closes = scan["tickers"], scan["last_close"].tolist()
+    up_counts, dn_counts, adv, returns, tdst = scan["up"], scan["dn"], scan["adv"], scan["ret"], scan["tdst"]
+    top_codes = np.select([up_counts == 13, up_counts == 9], [SIGNAL_DM13, SIGNAL_DM9], SIGNAL_NONE)
+    bot_codes = np.select([dn_counts == 13, dn_counts == 9], [SIGNAL_DM13, SIGNAL_DM9], SIGNAL_NONE)
+    watch = np.isin(up_counts, list(WATCH_COUNTS)) | np.isin(dn_counts, list(WATCH_COUNTS))
+    results["Returns"] = dict(zip(scanned, returns.tolist()))
+    results["Spark"] = scan["spark"]
+
+    for i in np.flatnonzero((top_codes > 0) | (bot_codes > 0) | watch):
+        ticker, last_close = scanned[i], last_closes[i]
+        up_count, dn_count = int(up_counts[i]), int(dn_counts[i])
+        if interval_label == "Sector":
+            industry = ticker_sector_map.get(ticker, "Unknown")  # use Sector as Industry for sector ETFs
+        else:
+            industry = ticker_industry_map.get(ticker, "Unknown")
+
+        if top_codes[i]:
+            signal = "DM13 Top" if top_codes[i] == SIGNAL_DM13 else "DM9 Top"
+            results["Tops"].append((ticker, last_close, signal, industry))
+
+        if bot_codes[i]:
+            signal = "DM13 Bot" if bot_codes[i] == SIGNAL_DM13 else "DM9 Bot"
+            results["Bottoms"].append((ticker, last_close, signal, industry))
+
+        if up_count in WATCH_COUNTS:
+            results["Watch"].append((ticker, last_close, "Top", up_count, industry))
+        if dn_count in WATCH_COUNTS:
+            results["Watch"].append((ticker, last_close, "Bot", dn_count, industry))
+
+        label = (INDUSTRY_ETF_LABELS.get(ticker_industry_map.get(ticker))
+                 or SECTOR_ETF_LABELS.get(ticker_sector_map.get(ticker)))
+        benchmark = (benchmarks or {}).get(label)
+        results["Rank"][ticker] = {
+            "adv": float(adv[i]),
+            "rs": float(returns[i] - benchmark) if benchmark is not None else float("nan"),
+            "tdst": float(tdst[i]),
+        }
 
     results["Tops"] = sorted(results["Tops"], key=lambda x: x[0])
     results["Bottoms"] = sorted(results["Bottoms"], key=lambda x: x[0])
+    results["Watch"] = sorted(results["Watch"], key=lambda x: (-x[3], x[0]))
+    results["Counts"] = {
+        "ids": table.encode("ticker", scanned),
+        "up": up_counts.astype(np.int16),
+        "dn": dn_counts.astype(np.int16),
+    }
+    with stage_profiler.stage("aggregate"):
+        sector_counts = aggregate_scan(scanned, top_codes, bot_codes, ticker_sector_map, ticker_industry_map, table)
 
     if not candle_date:
         candle_date = datetime.utcnow().strftime("%Y-%m-%d")
 
+    # Remember how many bars each ticker needs (counts, ranking features, sparklines)
+    # so the next run can fetch less
+    min_bars = dm_kernels.min_exact_bars(up_counts, dn_counts,
+                                         floor=max(dm_kernels.MIN_BARS, ranking.MIN_BARS, sparkline_bars))
+    lookback.save_lookback(cache_key, interval, candle_date, scanned, min_bars)
+    if len(min_bars):
+        print(f"📏 [{interval_label}] Counts need {int(min_bars.max())} bars at most "
+              f"(median {int(np.median(min_bars))}) vs {scan['bars']} fetched")
+    shard_note = f", {planner.count} shards of up to {planner.largest}" if sharded else ""
+    print(f"🧠 [{interval_label}] Peak RSS {shards.peak_rss_mb():.0f} MB{shard_note}")
+
     return results, sector_counts, candle_date
 
 
+
+
+# Stock sector / industry -> label of the sector ETF tracking it (see sectors_cache.csv)
+SECTOR_ETF_LABELS = {
+    "Technology": "Technology",
+    "Financial": "Financials",
+    "Communication Services": "Communications",
+    "Consumer Cyclical": "Discretionary",
+    "Consumer Defensive": "Staples",
+    "Real Estate": "Real Estate",
+    "Healthcare": "Healthcare",
+    "Energy": "Energy",
+    "Utilities": "Utilities",
+    "Basic Materials": "Materials",
+    "Industrials": "Industrials",
+}
+INDUSTRY_ETF_LABELS = {
+    "Biotechnology": "Biotechnology",
+    "Banks - Regional": "Regional Banks",
+    "Residential Construction": "Home Builders",
+    "Gold": "Gold",
+    "Silver": "Silver",
+}
+WEEKLY_CONFLUENCE_MIN = 7  # weekly same-direction count that backs up a daily signal
+
+
+def find_confluence(daily_results, weekly_results, sector_results, ticker_ids,
+                    ticker_sector_map, ticker_industry_map):
+    # Hash joins on ticker ID (daily x weekly) and on ETF label (daily x sector ETFs), all O(n)
+    weekly = weekly_results["Counts"]
+    weekly_by_id = dict(zip(weekly["ids"].tolist(), zip(weekly["up"].tolist(), weekly["dn"].tolist())))
+
+    etf_signals = {}
+    for side in ("Tops", "Bottoms"):
+        for etf, _, signal, label in sector_results[side]:
+            etf_signals[label] = (etf, signal)
+
+    confluence = []
+    for side, direction in (("Tops", "Top"), ("Bottoms", "Bot")):
+        for ticker, close, signal, industry in daily_results[side]:
+            reasons = []
+            up, dn = weekly_by_id.get(ticker_ids.get(ticker, -1), (0, 0))
+            weekly_count = up if direction == "Top" else dn
+            if weekly_count >= WEEKLY_CONFLUENCE_MIN:
+                reasons.append(f"Weekly {direction} {weekly_count}")
+
+            for label in (SECTOR_ETF_LABELS.get(ticker_sector_map.get(ticker)),
+                          INDUSTRY_ETF_LABELS.get(ticker_industry_map.get(ticker))):
+                if label in etf_signals and etf_signals[label][1].endswith(direction):
+                    etf, etf_signal = etf_signals[label]
+                    reasons.append(f"{etf} {etf_signal}")
+
+            if reasons:
+                confluence.append((ticker, close, signal, industry, reasons))
+
+    return sorted(confluence, key=lambda x: (-len(x[4]), x[0]))
+
+
 def get_fear_and_greed():
     url = "https://production.dataviz.cnn.io/index/fearandgreed/graphdata"
     headers = {
@@ -212,7 +645,7 @@ def get_fear_and_greed():
     }
 
     try:
-        response = requests.get(url, headers=headers, timeout=10)
+        response = get_session().get(url, headers=headers, timeout=10)
         response.raise_for_status()
         data = response.json()
 
@@ -245,58 +678,25 @@ def get_fear_and_greed():
         return "N/A", "N/A", "N/A"
 
 
-def count_signals_by_sector(daily_results, weekly_results, daily_sectors, weekly_sectors):
+def count_signals_by_sector(daily_sectors, weekly_sectors):
+    # Total signals per sector across both timeframes, from the aggregated breadth
     sector_counts = defaultdict(int)
-
-    for signal_list, sector_map in [
-        (daily_results["Bottoms"], daily_sectors),
-        (daily_results["Tops"], daily_sectors),
-        (weekly_results["Bottoms"], weekly_sectors),
-        (weekly_results["Tops"], weekly_sectors),
-    ]:
-        for ticker, *_ in signal_list:
-            sector = sector_map.get(ticker, "Unknown")
-            sector_counts[sector] += 1
+    for breadth in (daily_sectors["Breadth"], weekly_sectors["Breadth"]):
+        for sector, row in breadth.items():
+            if row["tops"] or row["bottoms"]:
+                sector_counts[sector] += row["tops"] + row["bottoms"]
 
     return dict(sorted(sector_counts.items(), key=lambda x: x[1], reverse=True))
 
 
-def plot_sector_trends(daily_sectors, weekly_sectors):
-    from collections import defaultdict
-
-    all_sectors = set(daily_sectors["Tops"].keys()) | set(daily_sectors["Bottoms"].keys()) | \
-                  set(weekly_sectors["Tops"].keys()) | set(weekly_sectors["Bottoms"].keys())
-
-    sectors = sorted(all_sectors)
-    daily_counts = []
-    weekly_counts = []
+def sector_signal_totals(daily_sectors, weekly_sectors):
+    # {sector: (daily signals, weekly signals)} for every sector with a signal, for the trends chart
+    def total(breadth, sector):
+        row = breadth.get(sector)
+        return row["tops"] + row["bottoms"] if row else 0
+    return {sector: (total(daily_sectors["Breadth"], sector), total(weekly_sectors["Breadth"], sector))
+            for sector in count_signals_by_sector(daily_sectors, weekly_sectors)}
 
-    for sector in sectors:
-        daily_total = daily_sectors["Tops"].get(sector, 0) + daily_sectors["Bottoms"].get(sector, 0)
-        weekly_total = weekly_sectors["Tops"].get(sector, 0) + weekly_sectors["Bottoms"].get(sector, 0)
-        daily_counts.append(daily_total)
-        weekly_counts.append(weekly_total)
-
-    x = range(len(sectors))
-    width = 0.35
-
-    plt.figure(figsize=(14, 8))
-    plt.barh([i - width/2 for i in x], daily_counts, height=width, label="Daily", color="lightcoral")
-    plt.barh([i + width/2 for i in x], weekly_counts, height=width, label="Weekly", color="skyblue")
-    plt.yticks(x, sectors)
-    plt.xlabel("Number of Signals")
-    plt.title("Sector Signal Trends: Daily vs Weekly")
-    plt.legend()
-    plt.tight_layout()
-
-    os.makedirs("docs", exist_ok=True)
-    plt.savefig("docs/sector_trends.png", bbox_inches="tight")
-    if os.path.exists("docs/sector_trends.png"):
-        print("✅ sector_trends.png exists.")
-    else:
-        print("❌ Failed to save sector_trends.png.")
-    plt.close()
-    
 
 def sector_counts_to_html(title, sector_counts):
     if not sector_counts:
@@ -309,7 +709,82 @@ def sector_counts_to_html(title, sector_counts):
     return html
 
 
-def signals_to_html_table(signals, sortable=False):
+def sector_breadth_to_html(daily_breadth, weekly_breadth):
+    sectors = sorted(set(daily_breadth) | set(weekly_breadth))
+    if not sectors:
+        return ""
+
+    empty = {"tops": 0, "bottoms": 0, "net": 0, "pct_on_9": 0.0}
+    html = "<h2>Sector Breadth</h2><table class='sortable'>"
+    html += (
+        "<tr><th>Sector</th><th>Scanned</th>"
+        "<th>D Tops</th><th>D Bottoms</th><th>D Net</th><th>D % on 9</th>"
+        "<th>W Tops</th><th>W Bottoms</th><th>W Net</th><th>W % on 9</th></tr>"
+    )
+    for sector in sectors:
+        d = daily_breadth.get(sector, empty)
+        w = weekly_breadth.get(sector, empty)
+        scanned = max(d.get("scanned", 0), w.get("scanned", 0))
+        html += f"<tr><td>{sector}</td><td>{scanned}</td>"
+        for row in (d, w):
+            net_style = "color: #dc3545;" if row["net"] > 0 else "color: #28a745;" if row["net"] < 0 else ""
+            html += (
+                f"<td>{row['tops']}</td><td>{row['bottoms']}</td>"
+                f"<td style='{net_style}'>{row['net']:+d}</td><td>{row['pct_on_9']:.1f}%</td>"
+            )
+        html += "</tr>"
+    html += "</table>"
+    return html
+
+
+def industry_leaders_to_html(title, industry_breadth, limit=10):
+    active = [(name, row) for name, row in industry_breadth.items() if row["tops"] or row["bottoms"]]
+    if not active:
+        return ""
+
+    active.sort(key=lambda x: (x[1]["tops"] + x[1]["bottoms"], x[0]), reverse=True)
+    html = f"<h3>{title}</h3><table><tr><th>Industry</th><th>Tops</th><th>Bottoms</th><th>% on 9</th></tr>"
+    for name, row in active[:limit]:
+        html += f"<tr><td>{name}</td><td>{row['tops']}</td><td>{row['bottoms']}</td><td>{row['pct_on_9']:.1f}%</td></tr>"
+    html += "</table>"
+    return html
+
+
+RANK_HEADERS = "<th>$ Vol 20d (M)</th><th>RS vs ETF 20d</th><th>TDST Dist</th>"
+
+
+def rank_cells(rank):
+    # Blank cells where a feature couldn't be computed, so the sorter puts them together
+    def fmt(value, spec):
+        return format(value, spec) if value is not None and not np.isnan(value) else ""
+    rank = rank or {}
+    return (f"<td>{fmt(rank.get('adv', np.nan) / 1e6, '.1f')}</td>"
+            f"<td>{fmt(rank.get('rs'), '+.1f')}</td>"
+            f"<td>{fmt(rank.get('tdst'), '+.1f')}</td>")
+
+
+def spark_header(spark):
+    return "<th>Chart</th>" if spark else ""
+
+
+def spark_cell(spark, ticker):
+    # Inline sparkline column, only present when the scan drew sparklines
+    return f"<td>{spark.get(ticker, '')}</td>" if spark else ""
+
+
+def drop_illiquid(results, min_dollar_volume):
+    # Copy of the results without names under the dollar-volume floor (unknown volume is kept)
+    def liquid(ticker):
+        adv = results.get("Rank", {}).get(ticker, {}).get("adv")
+        return adv is None or np.isnan(adv) or adv >= min_dollar_volume
+    filtered = dict(results)
+    for key in ("Tops", "Bottoms", "Watch"):
+        filtered[key] = [row for row in results[key] if liquid(row[0])]
+    hidden = sum(len(results[k]) - len(filtered[k]) for k in ("Tops", "Bottoms", "Watch"))
+    return filtered, hidden
+
+
+def signals_to_html_table(signals, sortable=False, rank=None, spark=None):
     if not signals:
         return "<p>No signals.</p>"
 
@@ -319,7 +794,7 @@ def signals_to_html_table(signals, sortable=False):
     table_class = "sortable" if sortable else ""
     html = f"<table class='{table_class}'>" if table_class else "<table>"
 
-    html += "<tr><th>Ticker</th><th>Close Price</th><th>Signal</th><th>Industry</th></tr>"
+    html += f"<tr><th>Ticker</th>{spark_header(spark)}<th>Close Price</th><th>Signal</th><th>Industry</th>{RANK_HEADERS}</tr>"
 
     for ticker, close_price, signal, industry in signals_sorted:
         # Safe formatting of close price
@@ -339,15 +814,84 @@ def signals_to_html_table(signals, sortable=False):
         else:
             style = ""
 
+        html += (
+            f"<tr>"
+            f"<td>{ticker}</td>"
+            f"{spark_cell(spark, ticker)}"
+            f"<td>{price_str}</td>"
+            f"<td style='{style}'>{signal}</td>"
+            f"<td>{industry}</td>"
+            f"{rank_cells((rank or {}).get(ticker))}"
+            f"</tr>"
+        )
+
+    html += "</table>"
+    return html
+
+
+def changes_to_html(changes, previous_as_of):
+    # New / dropped signals since the previous run's snapshot
+    if previous_as_of is None:
+        return "<p>No earlier snapshot to compare against yet.</p>"
+    if not changes:
+        return f"<p>No signals now or on {previous_as_of}.</p>"
+
+    html = (f"<p><em>Compared with {previous_as_of}</em></p>"
+            "<table><tr><th>Signal</th><th>New</th><th>Continuing</th><th>Dropped</th></tr>")
+    for name, kinds in changes.items():
+        html += (
+            f"<tr>"
+            f"<td>{name}</td>"
+            f"<td>{', '.join(kinds['new']) or '-'}</td>"
+            f"<td>{len(kinds['continuing'])}</td>"
+            f"<td>{', '.join(kinds['dropped']) or '-'}</td>"
+            f"</tr>"
+        )
+    html += "</table>"
+    return html
+
+
+def confluence_to_html_table(entries):
+    if not entries:
+        return "<p>No confluence today.</p>"
+
+    html = "<table class='sortable'><tr><th>Ticker</th><th>Close Price</th><th>Daily Signal</th><th>Confirmed By</th><th>Industry</th></tr>"
+    for ticker, close_price, signal, industry, reasons in entries:
+        price_str = f"{close_price:.2f}" if isinstance(close_price, (int, float)) else "N/A"
+        style = "background-color: #ffb3b3;" if signal.endswith("Top") else "background-color: #d4edda;"
         html += (
             f"<tr>"
             f"<td>{ticker}</td>"
             f"<td>{price_str}</td>"
             f"<td style='{style}'>{signal}</td>"
+            f"<td>{', '.join(reasons)}</td>"
             f"<td>{industry}</td>"
             f"</tr>"
         )
+    html += "</table>"
+    return html
+
 
+def watchlist_to_html_table(entries, rank=None, spark=None):
+    if not entries:
+        return "<p>Nothing approaching.</p>"
+
+    html = f"<table class='sortable'><tr><th>Ticker</th>{spark_header(spark)}<th>Close Price</th><th>Count</th><th>Approaching</th><th>Industry</th>{RANK_HEADERS}</tr>"
+    for ticker, close_price, side, count, industry in entries:
+        price_str = f"{close_price:.2f}" if isinstance(close_price, (int, float)) else "N/A"
+        target = f"{WATCH_COUNTS[count]} {side}"
+        style = "background-color: #ffe5e5;" if side == "Top" else "background-color: #eaf6ec;"
+        html += (
+            f"<tr>"
+            f"<td>{ticker}</td>"
+            f"{spark_cell(spark, ticker)}"
+            f"<td>{price_str}</td>"
+            f"<td>{count}</td>"
+            f"<td style='{style}'>{target}</td>"
+            f"<td>{industry}</td>"
+            f"{rank_cells((rank or {}).get(ticker))}"
+            f"</tr>"
+        )
     html += "</table>"
     return html
 
@@ -363,8 +907,8 @@ def build_sector_signal_grid_html(sector_results):
     expected_labels = {label for row in grid_labels for label in row}
     sector_signals = {}
 
-    for signal_type, entries in sector_results.items():
-        for ticker, signal, sector, _ in entries:
+    for signal_type in ("Tops", "Bottoms"):
+        for ticker, _, signal, sector in sector_results[signal_type]:
             if sector in expected_labels:
                 current = sector_signals.get(sector)
                 if current is None or ("DM13" in signal and "DM9" in current):
@@ -390,52 +934,11 @@ def build_sector_signal_grid_html(sector_results):
     return html
 
 
-def plot_fear_greed_trend(csv_path="fear_and_greed_history.csv",
-                          out_path="docs/fg_trend.png",
-                          lookback_days=120):
-    try:
-        if not os.path.exists(csv_path):
-            return None
-
-        df = pd.read_csv(csv_path)
-        if df.empty or "Date" not in df.columns or "Index" not in df.columns:
-            return None
-
-        # Make Date UTC-aware for safe comparisons
-        df["Date"] = pd.to_datetime(df["Date"], utc=True, errors="coerce")
-        df = df.dropna(subset=["Date", "Index"]).sort_values("Date")
-
-        # Use UTC-aware cutoff
-        cutoff = pd.Timestamp.now(tz=pytz.UTC) - pd.Timedelta(days=lookback_days)
-        df = df[df["Date"] >= cutoff]
-        if df.empty:
-            return None
-
-        # For plotting, remove tz info (matplotlib is happier with naive)
-        df_plot = df.copy()
-        df_plot["Date"] = df_plot["Date"].dt.tz_localize(None)
-
-        plt.figure(figsize=(9, 4.4))
-        plt.plot(df_plot["Date"], df_plot["Index"])
-        plt.title("CNN Fear & Greed (last ~120 days)")
-        plt.xlabel("Date")
-        plt.ylabel("Index")
-        plt.gca().xaxis.set_major_formatter(mdates.DateFormatter("%b %d"))
-        plt.gcf().autofmt_xdate(rotation=45)
-        plt.tight_layout()
-        os.makedirs("docs", exist_ok=True)
-        plt.savefig(out_path, bbox_inches="tight")
-        plt.close()
-
-        return out_path if os.path.exists(out_path) else None
-    except Exception as e:
-        print(f"⚠️ Could not plot Fear & Greed trend: {e}")
-        return None
-
-
 def write_html_report(daily_results, weekly_results, daily_sectors, weekly_sectors,
                       fg_index, fg_prev, fg_date, total_tickers, sector_results,
-                      weekly_date, fg_plot_path=None, report_date_str=None, stale_threshold_seconds=3600):
+                      weekly_date, fg_plot_path=None, report_date_str=None, stale_threshold_seconds=3600,
+                      sector_history_path=None, confluence=None, out_path="docs/index.html",
+                      sector_trends_path="docs/sector_trends.png", changes=None, previous_as_of=None):
     
     # Determine color for Fear & Greed index
     if fg_index != "N/A":
@@ -454,9 +957,10 @@ def write_html_report(daily_results, weekly_results, daily_sectors, weekly_secto
     weekly_bottoms = len(weekly_results["Bottoms"])
     daily_tops = len(daily_results["Tops"])
     weekly_tops = len(weekly_results["Tops"])
-                          
+    daily_watch = len(daily_results["Watch"])
+    weekly_watch = len(weekly_results["Watch"])
+
     # Get current timestamp for staleness checking
-    import time
     page_load_time = int(time.time())
 
     # Opening HTML + CSS
@@ -607,7 +1111,7 @@ def write_html_report(daily_results, weekly_results, daily_sectors, weekly_secto
         <div class="fg-box">
             <strong>CNN Fear & Greed Index:</strong> {fg_index} (Prev: {fg_prev}) on {fg_date}
         </div>
-        {f'<img src="fg_trend.png" alt="Fear & Greed Trend" style="max-width: 480px; display:block; margin:6px 0 16px 0;">' if fg_plot_path else ''}
+        {f'<img src="{os.path.basename(fg_plot_path)}" alt="Fear & Greed Trend" style="max-width: 480px; display:block; margin:6px 0 16px 0;">' if fg_plot_path else ''}
 
         <h2>Signal Summary</h2>
         <table class="summary-table">
@@ -626,23 +1130,55 @@ def write_html_report(daily_results, weekly_results, daily_sectors, weekly_secto
                 <td>{daily_tops}</td>
                 <td>{weekly_tops}</td>
             </tr>
+            <tr>
+                <td><strong>Approaching</strong></td>
+                <td>{daily_watch}</td>
+                <td>{weekly_watch}</td>
+            </tr>
         </table>
     """
 
+    # What's new since the last run
+    html += f"""
+    <h2>What Changed</h2>
+    {changes_to_html(changes or {}, previous_as_of)}
+    """
+
     # Sector grid
-    html += build_sector_signal_grid_html(sector_results)
+    html += sector_watch.wrap_fragment(build_sector_signal_grid_html(sector_results))
+
+    # Daily signals backed by the weekly count or their sector ETF
+    html += f"""
+    <h2>Multi-Timeframe Confluence</h2>
+    {confluence_to_html_table(confluence or [])}
+    """
+
+    # Breadth by sector, plus the busiest industries
+    html += sector_breadth_to_html(daily_sectors["Breadth"], weekly_sectors["Breadth"])
+    html += f"""
+    <div class="row">
+        <div class="column">
+            {industry_leaders_to_html("Most Active Industries (Daily)", daily_sectors["Industry"])}
+        </div>
+        <div class="column">
+            {industry_leaders_to_html("Most Active Industries (Weekly)", weekly_sectors["Industry"])}
+        </div>
+    </div>
+    """
 
     # Bottoms section
     html += f"""
     <div class="row">
         <div class="column">
             <h2>Daily Bottoms</h2>
-            {signals_to_html_table(daily_results["Bottoms"], sortable=True)}
+            {signals_to_html_table(daily_results["Bottoms"], sortable=True, rank=daily_results["Rank"],
+                                  spark=daily_results["Spark"])}
             {sector_counts_to_html("Daily Bottoms by Sector", daily_sectors["Bottoms"])}
         </div>
         <div class="column">
             <h2>Weekly Bottoms</h2>
-            {signals_to_html_table(weekly_results["Bottoms"], sortable=True)}
+            {signals_to_html_table(weekly_results["Bottoms"], sortable=True, rank=weekly_results["Rank"],
+                                  spark=weekly_results["Spark"])}
             <p><em>Weekly signals last updated on {weekly_date}</em></p>
             {sector_counts_to_html("Weekly Bottoms by Sector", weekly_sectors["Bottoms"])}
         </div>
@@ -654,18 +1190,36 @@ def write_html_report(daily_results, weekly_results, daily_sectors, weekly_secto
     <div class="row">
         <div class="column">
             <h2>Daily Tops</h2>
-            {signals_to_html_table(daily_results["Tops"], sortable=True)}
+            {signals_to_html_table(daily_results["Tops"], sortable=True, rank=daily_results["Rank"],
+                                  spark=daily_results["Spark"])}
             {sector_counts_to_html("Daily Tops by Sector", daily_sectors["Tops"])}
         </div>
         <div class="column">
             <h2>Weekly Tops</h2>
-            {signals_to_html_table(weekly_results["Tops"], sortable=True)}
+            {signals_to_html_table(weekly_results["Tops"], sortable=True, rank=weekly_results["Rank"],
+                                  spark=weekly_results["Spark"])}
             <p><em>Weekly signals last updated on {weekly_date}</em></p>
             {sector_counts_to_html("Weekly Tops by Sector", weekly_sectors["Tops"])}
         </div>
     </div>
     """
 
+    # Watchlist: setups at 7-8 and 11-12, one or two bars from a signal
+    html += f"""
+    <div class="row">
+        <div class="column">
+            <h2>Daily Watchlist</h2>
+            {watchlist_to_html_table(daily_results["Watch"], rank=daily_results["Rank"],
+                                    spark=daily_results["Spark"])}
+        </div>
+        <div class="column">
+            <h2>Weekly Watchlist</h2>
+            {watchlist_to_html_table(weekly_results["Watch"], rank=weekly_results["Rank"],
+                                    spark=weekly_results["Spark"])}
+        </div>
+    </div>
+    """
+
     # JavaScript (plain string, no f!)
     html += """
     <script>
@@ -707,77 +1261,146 @@ def write_html_report(daily_results, weekly_results, daily_sectors, weekly_secto
     """
 
     # Sector trends
-    html += """
+    html += f"""
     <h2 style="margin-top: 40px;">Sector Signal Trends</h2>
-    <img src="sector_trends.png" alt="Sector Trends" style="max-width: 100%;">
+    {f'<img src="{os.path.basename(sector_trends_path)}" alt="Sector Trends" style="max-width: 100%;">' if sector_trends_path else ''}
+    {f'<img src="{os.path.basename(sector_history_path)}" alt="Sector Signal History" style="max-width: 100%;">' if sector_history_path else ''}
     </body>
     </html>
     """
 
     # Write HTML
-    os.makedirs("docs", exist_ok=True)
-    with open("docs/index.html", "w", encoding="utf-8") as f:
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    with open(out_path, "w", encoding="utf-8") as f:
         f.write(html)
 
-def main():
-    start_time = time.time()
-    print("⏳ Starting DM Scanner")
 
-    # Step 1: Load ticker-sector maps
-    t0 = time.time()
-    sp500_map, sp500_industry = fetch_tickers_and_sectors_from_csv("sp_cache.csv")
-    russell_map, russell_industry = fetch_tickers_and_sectors_from_csv("russell_cache.csv")
-    nasdaq_map, nasdaq_industry = fetch_tickers_and_sectors_from_csv("nasdaq_cache.csv")
-    NDQ_map, NDQ_industry = fetch_tickers_and_sectors_from_csv("NDQ_cache.csv")
-    AMEX_map, AMEX_industry = fetch_tickers_and_sectors_from_csv("AMEX_cache.csv")
-    NYSE_map, NYSE_industry = fetch_tickers_and_sectors_from_csv("NYSE_cache.csv")
-    total_tickers = (
-        len(sp500_map) 
-        + len(russell_map) 
-        + len(nasdaq_map) 
-        + len(NDQ_map) 
-        + len(AMEX_map) 
-        + len(NYSE_map)
-    )
+def write_sector_report(sector_results, out_path="docs/sectors.html", report_date_str=None):
+    # Stand-alone page with just the sector ETF grid, for the sector-only profile
+    html = f"""
+    <html>
+    <head>
+        <meta charset="UTF-8">
+        <title>US DM Sector Grid</title>
+        <style>
+            body {{ font-family: Arial, sans-serif; margin: 20px; }}
+            .sector-grid {{ display: flex; flex-wrap: wrap; width: 100%; }}
+            .sector-cell {{
+                border: 1px solid #ccc;
+                padding: 12px 14px;
+                text-align: center;
+                font-weight: bold;
+                flex: 0 0 33.33%;
+                box-sizing: border-box;
+            }}
+            @media (min-width: 64em) {{ .sector-cell {{ flex: 0 0 16.66%; }} }}
+        </style>
+    </head>
+    <body>
+        <h1>📈 US DM Sector Grid 📉</h1>
+        {f'<div class="date-subtitle">{report_date_str}</div>' if report_date_str else ''}
+        {sector_watch.wrap_fragment(build_sector_signal_grid_html(sector_results))}
+    </body>
+    </html>
+    """
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    with open(out_path, "w", encoding="utf-8") as f:
+        f.write(html)
 
-    all_map = {**sp500_map, **russell_map, **nasdaq_map, **NDQ_map, **AMEX_map, **NYSE_map}
-    all_industry_map = {**sp500_industry, **russell_industry, **nasdaq_industry, **NDQ_industry, **AMEX_industry, **NYSE_industry}
-    print(f"📁 Loaded ticker maps in {time.time() - t0:.2f} seconds")
 
-    # Step 1b: Load Sector ETF tickers
-    sector_map, sector_industry = fetch_tickers_and_sectors_from_csv("sectors_cache.csv")
-    sector_results, _, _ = scan_timeframe(sector_map, sector_industry, "Sector", "1d")
+def empty_scan():
+    # Stand-in for a timeframe a profile doesn't scan
+    results = {"Tops": [], "Bottoms": [], "Watch": [], "Rank": {}, "Returns": {}, "Spark": {},
+               "Counts": {"ids": np.empty(0, np.int32), "up": np.empty(0, np.int16), "dn": np.empty(0, np.int16)}}
+    return results, aggregate_scan([], [], [], {}, {}), datetime.utcnow().strftime("%Y-%m-%d")
+
+
+def run_profile(profile, config):
+    start_time = time.time()
+    print(f"⏳ Starting DM Scanner [{profile['name']}] {profile['description']}")
+    timeframes = config["timeframes"]
+    fetch_options = {**config["fetch"], "live": profile["live"]}
+    prefix = profile["cache_key_prefix"]
 
-    # 🛠️ DEBUG: Show tickers and signals detected in sector scan
-    print("\n🔍 Sector Signal Results:")
-    for s in sector_results["Bottoms"]:
-        print(f"✅ Bottom: {s}")
-    for s in sector_results["Tops"]:
-        print(f"🔺 Top:    {s}")
+    # Step 1: Load ticker-sector maps
+    t0 = time.time()
+    all_map, all_industry_map = {}, {}
+    total_tickers = 0
+    with stage_profiler.stage("universe"):
+        for universe_file in profile["universes"]:
+            universe_map, universe_industry = fetch_tickers_and_sectors_from_csv(universe_file)
+            total_tickers += len(universe_map)
+            all_map.update(universe_map)
+            all_industry_map.update(universe_industry)
+        print(f"📁 Loaded ticker maps in {time.time() - t0:.2f} seconds")
+
+        # Step 1b: Load Sector ETF tickers
+        sector_map, sector_industry = {}, {}
+        if profile["sector_universe"]:
+            sector_map, sector_industry = fetch_tickers_and_sectors_from_csv(profile["sector_universe"])
+        table = symbols.load()
+        register_universe(table, (all_map, sector_map), (all_industry_map, sector_industry))
+        ticker_ids = table.ids("ticker")
+
+    sector_results, sector_date = empty_scan()[0], None
+    if sector_map:
+        tf = timeframes["Sector"]
+        sector_results, _, sector_date = scan_timeframe(
+            sector_map, sector_industry, "Sector", tf["interval"], table,
+            period=tf["period"], fetch_options=fetch_options, cache_key=prefix + "Sector",
+            quality=config["quality"])
+
+        print(f"📊 Sector ETFs: {len(sector_results['Tops'])} tops / {len(sector_results['Bottoms'])} bottoms")
+
+    if not profile["timeframes"]:
+        if not sector_map:
+            print(f"⚠️ Profile {profile['name']} has no sector tickers to scan; "
+                  f"leaving {profile['report']} as it is")
+            return
+        sector_dt = datetime.strptime(sector_date, "%Y-%m-%d")
+        with stage_profiler.stage("html"):
+            write_sector_report(sector_results, profile["report"],
+                                report_date_str=f"Sector signals as of {sector_dt.strftime('%A, %b %d, %Y')}")
+        print(f"📝 Sector grid written to {profile['report']}")
+        print(f"\n✅ Profile {profile['name']} completed in {time.time() - start_time:.2f} seconds")
+        return
 
     # Step 2: Timestamp + Fear & Greed
     t1 = time.time()
     now_str = datetime.utcnow().strftime("%Y-%m-%d %H:%M UTC")
-    fg_val, fg_prev, fg_date = get_fear_and_greed()
-    fg_plot_path = plot_fear_greed_trend()
+    with stage_profiler.stage("fear_greed"):
+        fg_val, fg_prev, fg_date = get_fear_and_greed()
+
+    # Charts render inline, or in a worker process that draws while the scan runs
+    renderer = None
+    if profile["charts"]:
+        renderer = charts.ChartRenderer(config["charts"]["backend"], config["charts"]["background"])
+        with stage_profiler.stage("plot"):
+            renderer.submit("fg_trend", charts.plot_fear_greed_trend)
     print(f"📊 Retrieved Fear & Greed Index in {time.time() - t1:.2f} seconds")
 
-    # Step 3: Daily signals
-    t2 = time.time()
-    daily_results, daily_sectors, daily_date = scan_timeframe(all_map, all_industry_map, "1D", "1d")
-    print(f"📉 Scanned Daily signals in {time.time() - t2:.2f} seconds")
-
-    # Step 4: Weekly signals
-    t3 = time.time()
-    # WEEKLY_CACHE_FILE = "cache/weekly_dm_cache.pkl"
-    # if is_friday_after_close() or not os.path.exists(WEEKLY_CACHE_FILE):
-    weekly_results, weekly_sectors, weekly_date = scan_timeframe(all_map, all_industry_map, "1W", "1wk")
-        # with open(WEEKLY_CACHE_FILE, "wb") as f:
-            # pickle.dump((weekly_results, weekly_sectors, weekly_date), f)
-    # else:
-        # with open(WEEKLY_CACHE_FILE, "rb") as f:
-            # weekly_results, weekly_sectors, weekly_date = pickle.load(f)
-    print(f"📈 Scanned Weekly signals in {time.time() - t3:.2f} seconds")
+    # Step 3/4: Daily and weekly signals, with relative strength against the sector ETFs'
+    # returns where both are measured on the same bars
+    benchmarks = {sector_map[etf]: ret for etf, ret in sector_results["Returns"].items()}
+    scans = {}
+    for label in profile["timeframes"]:
+        t2 = time.time()
+        tf = timeframes[label]
+        same_bars = sector_map and tf["interval"] == timeframes["Sector"]["interval"]
+        scans[label] = scan_timeframe(all_map, all_industry_map, label, tf["interval"], table,
+                                      period=tf["period"], fetch_options=fetch_options,
+                                      cache_key=prefix + label, benchmarks=benchmarks if same_bars else None,
+                                      memory=config["memory"], quality=config["quality"],
+                                      sparkline_bars=config["charts"]["sparkline_bars"])
+        print(f"📉 Scanned {label} signals in {time.time() - t2:.2f} seconds")
+    daily_results, daily_sectors, daily_date = scans.get("1D") or empty_scan()
+    weekly_results, weekly_sectors, weekly_date = scans.get("1W") or empty_scan()
+
+    # Step 4b: Daily signals confirmed by weekly counts or sector ETFs
+    with stage_profiler.stage("aggregate"):
+        confluence = find_confluence(daily_results, weekly_results, sector_results, ticker_ids,
+                                     all_map, all_industry_map)
+    print(f"🔗 Found {len(confluence)} confluence signals")
 
     daily_dt = datetime.strptime(daily_date, "%Y-%m-%d")
     report_date_str = f"Signals triggered on {daily_dt.strftime('%A, %b %d, %Y')} (as of NY market close)"
@@ -802,22 +1425,199 @@ def main():
     print_section("Sector Bottoms", sector_results["Bottoms"])
     print_section("Sector Tops", sector_results["Tops"])
 
-    # Count signals by sector and plot chart
-    plot_sector_trends(daily_sectors, weekly_sectors)
+    if profile["store_history"]:
+        # Append today's signals to the history DB
+        with stage_profiler.stage("store"):
+            store = signal_store.connect()
+            stored = 0
+            if sector_map:
+                stored += signal_store.append_signals(store, sector_date, "Sector", sector_results, sector_map,
+                                                      ticker_ids)
+            for label, (results, _, candle_date) in scans.items():
+                stored += signal_store.append_signals(store, candle_date, label, results, all_map, ticker_ids)
+            print(f"🗄️ Stored {stored} signals in {signal_store.DB_PATH}")
+        if renderer:
+            renderer.submit("sector_history", charts.plot_sector_history, signal_store.sector_series(store),
+                            inline=True)
+        store.close()
+
+    # Count signals by sector and plot chart, then collect the background fg_trend chart
+    chart_paths = {}
+    if renderer:
+        with stage_profiler.stage("plot"):
+            renderer.submit("sector_trends", charts.plot_sector_trends,
+                            sector_signal_totals(daily_sectors, weekly_sectors), inline=True)
+            chart_paths = renderer.wait()
+
+    # Snapshot the signal set and diff it against the previous candle date's. Taken
+    # before the liquidity filter, so a name crossing min_dollar_volume isn't a signal change
+    with stage_profiler.stage("store"):
+        signalled = {label: {"1D": daily_results, "1W": weekly_results}[label]
+                     for label in profile["timeframes"] if label in ("1D", "1W")}
+        signal_sets = snapshots.signal_sets(signalled, ticker_ids)
+        previous = snapshots.load_previous(profile["name"], daily_date)
+        previous_as_of = previous["as_of"] if previous else None
+        changes = snapshots.diff(signal_sets, previous, table.names("ticker"), ticker_ids)
+        snapshots.save_snapshot(profile["name"], daily_date, table.names("ticker"), signal_sets)
+        feed_path = snapshots.write_feed(f"{os.path.splitext(profile['report'])[0]}_changes.json",
+                                         daily_date, previous_as_of, changes, signalled)
+    new_count = sum(len(kinds["new"]) for kinds in changes.values())
+    if previous_as_of:
+        print(f"🆕 {new_count} new signals since {previous_as_of} (feed: {feed_path})")
+    else:
+        print(f"🆕 First snapshot: {new_count} signals recorded (feed: {feed_path})")
 
-    # Step 6: HTML output
+    # Step 6: HTML output, without illiquid names
     t4 = time.time()
-    write_html_report(
-        daily_results, weekly_results, daily_sectors, weekly_sectors, fg_val, fg_prev, fg_date, total_tickers, sector_results, weekly_date,
-        fg_plot_path=fg_plot_path,
-        report_date_str = report_date_str
-    )
+    min_dollar_volume = config["ranking"]["min_dollar_volume"]
+    daily_results, hidden_daily = drop_illiquid(daily_results, min_dollar_volume)
+    weekly_results, hidden_weekly = drop_illiquid(weekly_results, min_dollar_volume)
+    reported = {label: {"1D": daily_results, "1W": weekly_results}[label] for label in signalled}
+    liquid_daily = {row[0] for row in daily_results["Tops"] + daily_results["Bottoms"]}
+    confluence = [entry for entry in confluence if entry[0] in liquid_daily]
+    if hidden_daily or hidden_weekly:
+        print(f"💧 Left {hidden_daily} daily / {hidden_weekly} weekly signals under "
+              f"${min_dollar_volume / 1e6:.1f}M/day out of the report")
+
+    # Alerts go out from background threads while the report is written, for the names the
+    # report shows; the first snapshot has nothing to compare against, so it alerts nothing
+    dispatcher = None
+    alert_config = config["alerts"]
+    if alert_config["enabled"] and alert_config["sinks"] and previous_as_of:
+        details = snapshots.signal_details(reported)
+        events = [e for e in alerts.events_from_changes(daily_date, changes, details, alert_config["signals"])
+                  if (f"{e['timeframe']} {e['signal']}", e["ticker"]) in details]
+        dispatcher = alerts.AlertDispatcher(alerts.build_sinks(alert_config["sinks"]),
+                                            alert_config["batch_size"], alert_config["max_per_hour"],
+                                            alert_config["pause_seconds"]).dispatch(events)
+    with stage_profiler.stage("html"):
+        write_html_report(
+            daily_results, weekly_results, daily_sectors, weekly_sectors, fg_val, fg_prev, fg_date, total_tickers, sector_results, weekly_date,
+            fg_plot_path=chart_paths.get("fg_trend"),
+            report_date_str = report_date_str,
+            sector_history_path=chart_paths.get("sector_history"),
+            sector_trends_path=chart_paths.get("sector_trends"),
+            confluence=confluence,
+            changes=changes,
+            previous_as_of=previous_as_of,
+            out_path=profile["report"]
+        )
     print(f"📝 HTML report written in {time.time() - t4:.2f} seconds")
 
+    if dispatcher:
+        with stage_profiler.stage("alerts"):
+            alerts.print_summary(dispatcher.wait(alert_config["wait_seconds"]))
+
     # Total runtime
     total_time = time.time() - start_time
-    print(f"\n✅ Script completed in {total_time:.2f} seconds")
+    print(f"\n✅ Profile {profile['name']} completed in {total_time:.2f} seconds")
+
+
+def fetch_live_bars(tickers, period):
+    # Short daily fetch for the sector watch, on the live session so it never queues behind a nightly fetch
+    data = Ticker(tickers, session=get_session("yahoo_live")).history(interval="1d", period=period)
+    if not isinstance(data, pd.DataFrame):
+        return {}
+    return {t: normalize_bars(data.xs(t, level=0)) for t in tickers if (t,) in data.index}
+
+
+def run_sector_watch(config, loop=False):
+    # Sector ETF fast path: keep the series hot, poll a few days at a time and only
+    # rewrite the grid fragment of the existing reports
+    options = config["sector_watch"]
+    sector_map, _ = fetch_tickers_and_sectors_from_csv(options["universe"])
+    watch = sector_watch.SectorWatch(sector_map, fetch_live_bars, period=options["period"],
+                                     poll_period=options["poll_period"], workers=options["workers"])
+    t0 = time.time()
+    fetched = watch.warm()
+    print(f"⚡ Sector watch: {len(watch.frames)} ETFs hot ({fetched} fetched in full) in {time.time() - t0:.2f}s")
+    try:
+        while True:
+            t0 = time.time()
+            # A failed cycle is logged and the loop carries on at the next interval
+            try:
+                polled, refetched = watch.poll()
+                results = watch.scan()
+                stamp = market_calendar.now_eastern().strftime("%a %b %d, %H:%M ET")
+                fragment = (build_sector_signal_grid_html(results)
+                            + f"<p><em>Sector grid updated {stamp}</em></p>")
+                updated = [path for path in options["reports"] if sector_watch.replace_fragment(path, fragment)]
+                print(f"⚡ [{stamp}] {len(results['Tops'])} tops / {len(results['Bottoms'])} bottoms, "
+                      f"{polled} polled{f', {refetched} refetched' if refetched else ''}, "
+                      f"updated {', '.join(updated) or 'no reports (run a full profile first)'} "
+                      f"in {time.time() - t0:.2f}s")
+            except Exception as e:
+                print(f"❌ Sector watch cycle failed: {e!r}")
+                traceback.print_exc()
+            elapsed = time.time() - t0
+            if not loop:
+                break
+            time.sleep(max(1.0, options["every_seconds"] - elapsed))
+    finally:
+        watch.close()
+
+
+def run_profiles(profiles, config):
+    # One cycle: every profile, sharing fetches through the in-process memo
+    reset_fetch_memo()
+    for profile in profiles:
+        run_profile(profile, config)
+    print_latency_summary()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="US DeMark 9/13 scanner")
+    parser.add_argument("--config", default=scan_config.CONFIG_FILE)
+    parser.add_argument("--profile", action="append", dest="profiles",
+                        help="profile to run (repeatable); defaults to default_profiles in the config")
+    parser.add_argument("--loop", action="store_true",
+                        help="keep running, re-running each profile every every_minutes")
+    parser.add_argument("--sector-watch", action="store_true",
+                        help="sector ETF fast path: poll and refresh just the sector grid "
+                             "(one cycle, or every [sector_watch] every_seconds with --loop)")
+    parser.add_argument("--profiling", nargs="?", const="profiling", metavar="DIR",
+                        help="write per-stage cProfile stats, collapsed stacks and tracemalloc "
+                             "top allocators to DIR (default: profiling/)")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="with --profiling, also record tracemalloc top allocators per stage (slow)")
+    args = parser.parse_args(argv)
+    if args.profiling and args.loop:
+        parser.error("--profiling is for single runs, not --loop")
+    if args.sector_watch and (args.profiles or args.profiling):
+        parser.error("--sector-watch runs on its own, without --profile or --profiling")
+
+    start_time = time.time()
+    config = scan_config.load_config(args.config)
+    if args.sector_watch:
+        run_sector_watch(config, loop=args.loop)
+        return
+    profiles = scan_config.select_profiles(config, args.profiles)
+
+    if not args.loop:
+        if args.profiling:
+            stage_profiler.enable(args.profiling, trace_memory=args.trace_memory)
+        try:
+            run_profiles(profiles, config)
+        finally:
+            stage_profiler.finish()
+        print(f"\n✅ Script completed in {time.time() - start_time:.2f} seconds "
+              f"(peak RSS {shards.peak_rss_mb():.0f} MB)")
+        return
+
+    next_run = {p["name"]: 0.0 for p in profiles}
+    while True:
+        now = time.time()
+        due = [p for p in profiles if next_run[p["name"]] <= now]
+        if due:
+            # A failed cycle (Yahoo down, a network blip) is logged and retried on schedule
+            try:
+                run_profiles(due, config)
+            except Exception as e:
+                print(f"❌ Cycle for {', '.join(p['name'] for p in due)} failed: {e!r}")
+                traceback.print_exc()
+            for p in due:
+                next_run[p["name"]] = now + 60 * (p["every_minutes"] or 1440)
+        time.sleep(max(1.0, min(next_run.values()) - time.time()))
 
 if __name__ == "__main__":
     main()
-
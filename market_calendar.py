@@ -0,0 +1,180 @@
+"""Offline NYSE trading calendar: holidays, early closes and the last completed session.
+
+Rules follow the NYSE holiday schedule: Saturday holidays are observed on the
+Friday before and Sunday holidays on the Monday after, except that New Year's
+Day on a Saturday is not observed at all. One-off closures go in SPECIAL_CLOSURES.
+"""
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+import pytz
+
+EASTERN = pytz.timezone("US/Eastern")
+REGULAR_CLOSE = time(16, 0)
+EARLY_CLOSE = time(13, 0)
+SETTLE_MINUTES = 20  # give the provider time to print the closing bar
+
+EPOCH = date(1970, 1, 1)  # day number 0
+
+SPECIAL_CLOSURES = {
+    date(2018, 12, 5),   # President G.H.W. Bush day of mourning
+    date(2025, 1, 9),    # President Carter day of mourning
+}
+
+
+def _nth_weekday(year, month, weekday, n):
+    first = date(year, month, 1)
+    return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+
+
+def _last_weekday(year, month, weekday):
+    last = date(year, month + 1, 1) - timedelta(days=1) if month < 12 else date(year, 12, 31)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _easter(year):
+    # Anonymous Gregorian algorithm
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = b // 4, b % 4
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month = (h + l - 7 * m + 114) // 31
+    day = (h + l - 7 * m + 114) % 31 + 1
+    return date(year, month, day)
+
+
+def _observed(day):
+    if day.weekday() == 5:
+        return day - timedelta(days=1)
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    return day
+
+
+@lru_cache(maxsize=None)
+def holidays(year):
+    days = set()
+    new_year = date(year, 1, 1)
+    if new_year.weekday() != 5:
+        days.add(_observed(new_year))
+    days.add(_nth_weekday(year, 1, 0, 3))          # Martin Luther King Jr. Day
+    days.add(_nth_weekday(year, 2, 0, 3))          # Washington's Birthday
+    days.add(_easter(year) - timedelta(days=2))    # Good Friday
+    days.add(_last_weekday(year, 5, 0))            # Memorial Day
+    if year >= 2022:
+        days.add(_observed(date(year, 6, 19)))     # Juneteenth
+    days.add(_observed(date(year, 7, 4)))          # Independence Day
+    days.add(_nth_weekday(year, 9, 0, 1))          # Labor Day
+    days.add(_nth_weekday(year, 11, 3, 4))         # Thanksgiving
+    days.add(_observed(date(year, 12, 25)))        # Christmas
+    return frozenset(days | {d for d in SPECIAL_CLOSURES if d.year == year})
+
+
+def is_trading_day(day):
+    return day.weekday() < 5 and day not in holidays(day.year)
+
+
+def previous_trading_day(day):
+    day -= timedelta(days=1)
+    while not is_trading_day(day):
+        day -= timedelta(days=1)
+    return day
+
+
+def close_time(day):
+    # 1pm closes: day before Independence Day, day after Thanksgiving, Christmas Eve
+    early = {
+        _nth_weekday(day.year, 11, 3, 4) + timedelta(days=1),
+        date(day.year, 7, 3),
+        date(day.year, 12, 24),
+    }
+    return EARLY_CLOSE if day in early and is_trading_day(day) else REGULAR_CLOSE
+
+
+def session_close(day):
+    """Timezone-aware datetime when the session's closing bar is considered final."""
+    close = EASTERN.localize(datetime.combine(day, close_time(day)))
+    return close + timedelta(minutes=SETTLE_MINUTES)
+
+
+def now_eastern():
+    return datetime.now(pytz.UTC).astimezone(EASTERN)
+
+
+def last_completed_session(now=None):
+    now = now or now_eastern()
+    today = now.date()
+    if is_trading_day(today) and now >= session_close(today):
+        return today
+    return previous_trading_day(today)
+
+
+def last_session_of_week(day):
+    monday = day - timedelta(days=day.weekday())
+    sessions = [monday + timedelta(days=i) for i in range(5) if is_trading_day(monday + timedelta(days=i))]
+    return sessions[-1] if sessions else None
+
+
+def last_completed_week(now=None):
+    """(Monday, last session) of the most recent week whose final session has closed."""
+    session = last_completed_session(now)
+    while last_session_of_week(session) != session:
+        monday = session - timedelta(days=session.weekday())
+        session = previous_trading_day(monday)
+    return session - timedelta(days=session.weekday()), session
+
+
+def expected_last_bar(interval, now=None):
+    """Bar date (session, or week's Monday) a fresh cache must contain, and when that bar went final."""
+    if interval == "1wk":
+        monday, session = last_completed_week(now)
+        return monday, session_close(session)
+    session = last_completed_session(now)
+    return session, session_close(session)
+
+
+def is_cache_fresh(created_at_utc, last_bar, interval, now=None):
+    """A cache is fresh if it was written after the expected bar went final and contains that bar."""
+    if not created_at_utc or not last_bar:
+        return False
+    bar, final_at = expected_last_bar(interval, now)
+    created = pytz.UTC.localize(datetime.fromisoformat(created_at_utc))
+    return created >= final_at and date.fromisoformat(last_bar) >= bar
+
+
+def day_number(day):
+    return (day - EPOCH).days
+
+
+def from_day_number(number):
+    return EPOCH + timedelta(days=int(number))
+
+
+def session_day_numbers(index):
+    """Bar timestamps -> int32 day numbers of their New York session date.
+
+    Yahoo gives daily/weekly bars as plain dates, except the in-progress bar,
+    which can arrive as a tz-aware timestamp; those are converted to New York
+    time before the date is taken.
+    """
+    if isinstance(index, pd.DatetimeIndex):
+        if index.tz is not None:
+            index = index.tz_convert(EASTERN).tz_localize(None)
+        return index.values.astype("datetime64[D]").astype(np.int32)
+
+    values = list(index)
+    if all(type(v) is date for v in values):
+        return np.array(values, dtype="datetime64[D]").astype(np.int32)
+    days = []
+    for v in values:
+        v = pd.Timestamp(v)
+        if v.tzinfo is not None:
+            v = v.tz_convert(EASTERN).tz_localize(None)
+        days.append(day_number(v.date()))
+    return np.array(days, dtype=np.int32)
@@ -0,0 +1,104 @@
+"""Crash-safe, versioned on-disk price cache.
+
+File layout is a pickle stream: a header dict, one (ticker, DataFrame) record
+per ticker, then a trailer with the record count. Frames hold lowercase columns
+indexed by int day number (see market_calendar.session_day_numbers). Files are written to a temp
+name and renamed into place, so a killed job leaves the previous cache intact.
+Readers check the header first (cheap) and the trailer last, so a foreign,
+truncated or out-of-date file is rejected instead of breaking the run.
+"""
+import os
+import pickle
+import platform
+import tempfile
+from datetime import datetime
+
+import pandas as pd
+
+SCHEMA_VERSION = 3   # 1 = the old bare {ticker: DataFrame} pickle, 2 = raw Yahoo date index
+MAGIC = "us-dm-scanner/price-cache"
+
+
+class CacheError(Exception):
+    pass
+
+
+def _pandas_major():
+    return pd.__version__.split(".")[0]
+
+
+def write_price_cache(path, data, interval, period, cache_key, extra=None):
+    header = {
+        "magic": MAGIC,
+        "schema_version": SCHEMA_VERSION,
+        "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+        "interval": interval,
+        "period": period,
+        "cache_key": cache_key,
+        "ticker_count": len(data),
+        "pandas_version": pd.__version__,
+        "python_version": platform.python_version(),
+        **(extra or {}),
+    }
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=".price-cache-", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+            for ticker, df in data.items():
+                pickle.dump((ticker, df), f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump({"end": True, "count": len(data)}, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    return header
+
+
+def _check_header(header, path, interval=None):
+    if not isinstance(header, dict) or header.get("magic") != MAGIC:
+        raise CacheError(f"{path} is not a versioned price cache")
+    if header.get("schema_version") != SCHEMA_VERSION:
+        raise CacheError(f"{path} has schema v{header.get('schema_version')}, expected v{SCHEMA_VERSION}")
+    if str(header.get("pandas_version", "")).split(".")[0] != _pandas_major():
+        raise CacheError(f"{path} was written by pandas {header.get('pandas_version')}, running {pd.__version__}")
+    if interval and header.get("interval") != interval:
+        raise CacheError(f"{path} holds {header.get('interval')} bars, expected {interval}")
+    return header
+
+
+def read_header(path, interval=None):
+    """Validate and return just the header, without reading any price data."""
+    try:
+        with open(path, "rb") as f:
+            header = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ValueError) as e:
+        raise CacheError(f"{path} is unreadable: {e}")
+    return _check_header(header, path, interval)
+
+
+def iter_price_cache(path, interval=None):
+    """Yield (ticker, DataFrame) records one at a time; raises CacheError if the file is cut short."""
+    try:
+        with open(path, "rb") as f:
+            header = _check_header(pickle.load(f), path, interval)
+            count = 0
+            while True:
+                record = pickle.load(f)
+                if isinstance(record, dict) and record.get("end"):
+                    if record.get("count") != count or count != header["ticker_count"]:
+                        raise CacheError(f"{path} has {count} records, header says {header['ticker_count']}")
+                    return
+                count += 1
+                yield record
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ValueError) as e:
+        raise CacheError(f"{path} is truncated or corrupt: {e}")
+
+
+def load_price_cache(path, interval=None):
+    header = read_header(path, interval)
+    return header, dict(iter_price_cache(path, interval))
@@ -0,0 +1,66 @@
+"""Cheap ranking features computed over the packed price arrays the scan already holds.
+
+All functions take (values, offsets) in the dm_kernels.pack_series layout and
+return one value per ticker; NaN where a series is too short.
+"""
+import numpy as np
+
+ADV_BARS = 20   # average dollar volume window
+RS_BARS = 20    # relative-strength return window
+TDST_SETUP_BARS = 9
+MIN_BARS = max(ADV_BARS, RS_BARS + 1)  # history the features need, on top of the counts
+
+
+def _tail_index(offsets, k):
+    # Index k bars before each series' last bar, or -1 when the series is too short
+    ends = offsets[1:] - 1
+    starts = ends - k
+    return np.where(starts >= offsets[:-1], starts, -1), ends
+
+
+def tail_mean(values, offsets, k=ADV_BARS):
+    """Mean of the finite values among the last k of each series, via cumulative sums.
+
+    Missing (NaN) bars are left out of the mean rather than counted as zero, and a
+    window with no finite values at all is NaN: unknown, not illiquid.
+    """
+    finite = np.isfinite(values)
+    csum = np.concatenate(([0.0], np.cumsum(np.where(finite, values, 0.0))))
+    cfinite = np.concatenate(([0], np.cumsum(finite)))
+    ends = offsets[1:]
+    starts = np.maximum(ends - k, offsets[:-1])
+    used = cfinite[ends] - cfinite[starts]
+    out = np.full(len(ends), np.nan)
+    ok = (ends - starts >= k) & (used > 0)
+    out[ok] = (csum[ends[ok]] - csum[starts[ok]]) / used[ok]
+    return out
+
+
+def tail_return(values, offsets, k=RS_BARS):
+    """Percent change over the last k bars of each series."""
+    starts, ends = _tail_index(offsets, k)
+    out = np.full(len(ends), np.nan)
+    ok = (starts >= 0) & (ends >= 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out[ok] = 100.0 * (values[ends[ok]] / values[starts[ok]] - 1.0)
+    return out
+
+
+def tdst_distance(close, high, low, offsets, counts, is_top, rows):
+    """Percent distance of the last close from TDST for the given ticker rows.
+
+    A sell setup (top) has TDST support at the lowest low of its first nine bars,
+    a buy setup (bottom) has TDST resistance at their highest high. Counts below
+    nine use the setup bars printed so far.
+    """
+    out = np.full(len(rows), np.nan)
+    for j, (row, count, top) in enumerate(zip(rows, counts, is_top)):
+        end = offsets[row + 1] - 1
+        first = end - count + 1
+        if count <= 0 or first < offsets[row]:
+            continue
+        setup = slice(first, first + min(count, TDST_SETUP_BARS))
+        level = np.nanmin(low[setup]) if top else np.nanmax(high[setup])
+        if level > 0:
+            out[j] = 100.0 * (close[end] / level - 1.0)
+    return out
@@ -0,0 +1,133 @@
+"""Rebuilds the *_cache.csv universe files: refreshes sector/industry from Yahoo
+profiles and drops tickers that have returned no price data for N runs in a row.
+
+    python refresh_universe.py                  # all stock universes
+    python refresh_universe.py NDQ_cache.csv --max-misses 3 --dry-run
+"""
+import argparse
+import csv
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from yahooquery import Ticker
+
+import dead_tickers
+from http_session import get_session, print_latency_summary
+
+UNIVERSE_FILES = [
+    "sp_cache.csv",
+    "russell_cache.csv",
+    "nasdaq_cache.csv",
+    "NDQ_cache.csv",
+    "AMEX_cache.csv",
+    "NYSE_cache.csv",
+]
+
+# Yahoo profile names -> the labels already used in our universe files
+SECTOR_ALIASES = {
+    "Financial Services": "Financial",
+}
+
+
+def read_universe(path):
+    with open(path, newline="") as f:
+        reader = csv.DictReader(f)
+        return reader.fieldnames, [row for row in reader if row.get("Ticker")]
+
+
+def write_universe_atomic(path, fieldnames, rows):
+    # Write next to the target and rename, so a killed run never leaves half a file
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix=".universe-", suffix=".csv", dir=directory)
+    try:
+        with os.fdopen(fd, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(rows)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _fetch_profile_batch(batch):
+    try:
+        data = Ticker(batch, session=get_session("yahoo")).asset_profile
+    except Exception as e:
+        print(f"⚠️ Profile batch starting {batch[0]} failed: {e}")
+        return {}
+    profiles = {}
+    for ticker, info in (data.items() if isinstance(data, dict) else []):
+        if isinstance(info, dict) and info.get("sector"):
+            sector = SECTOR_ALIASES.get(info["sector"], info["sector"])
+            profiles[ticker] = (sector, info.get("industry") or "Unknown")
+    return profiles
+
+
+def fetch_profiles(tickers, batch_size=100, workers=4):
+    batches = [tickers[i:i + batch_size] for i in range(0, len(tickers), batch_size)]
+    print(f"🌐 Fetching profiles for {len(tickers)} tickers in {len(batches)} batches ({workers} workers)...")
+    profiles = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for result in pool.map(_fetch_profile_batch, batches):
+            profiles.update(result)
+    print(f"✅ Got profiles for {len(profiles)}/{len(tickers)} tickers")
+    return profiles
+
+
+def refresh_rows(rows, profiles, dead):
+    kept, dropped, changed = [], [], 0
+    for row in rows:
+        ticker = row["Ticker"].strip()
+        if ticker in dead:
+            dropped.append(ticker)
+            continue
+        if ticker in profiles:
+            sector, industry = profiles[ticker]
+            if row.get("Sector") != sector or ("Industry" in row and row.get("Industry") != industry):
+                changed += 1
+            row["Sector"] = sector
+            if "Industry" in row:
+                row["Industry"] = industry
+        row["Ticker"] = ticker
+        kept.append(row)
+    return kept, dropped, changed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Refresh ticker/sector/industry universe files")
+    parser.add_argument("files", nargs="*", default=UNIVERSE_FILES)
+    parser.add_argument("--max-misses", type=int, default=5,
+                        help="drop tickers with no price data for this many consecutive runs")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--skip-profiles", action="store_true", help="only prune dead tickers")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args(argv)
+
+    universes = {}
+    for path in args.files:
+        if not os.path.exists(path):
+            print(f"❌ Universe file {path} not found!")
+            continue
+        universes[path] = read_universe(path)
+
+    dead = dead_tickers.dead_tickers(dead_tickers.load_misses(), args.max_misses)
+    tickers = sorted({row["Ticker"].strip() for _, rows in universes.values() for row in rows} - dead)
+    profiles = {} if args.skip_profiles else fetch_profiles(tickers, args.batch_size, args.workers)
+
+    for path, (fieldnames, rows) in universes.items():
+        kept, dropped, changed = refresh_rows(rows, profiles, dead)
+        print(f"📁 {path}: kept {len(kept)}, dropped {len(dropped)}, updated {changed}")
+        if dropped:
+            print(f"   🗑️ {', '.join(sorted(dropped))}")
+        if not args.dry_run:
+            write_universe_atomic(path, fieldnames, kept)
+
+    print_latency_summary()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,95 @@
+"""Loads scan profiles (universes, timeframes, lookbacks, outputs) from scan_profiles.toml."""
+import os
+import tomllib
+
+CONFIG_FILE = "scan_profiles.toml"
+
+FETCH_DEFAULTS = {"batch_size": 50, "sleep_seconds": 1.5}
+RANKING_DEFAULTS = {"min_dollar_volume": 0}
+MEMORY_DEFAULTS = {"shard_size": 0, "max_rss_mb": 0}
+CHART_DEFAULTS = {"backend": "matplotlib", "background": True, "sparkline_bars": 40}
+QUALITY_DEFAULTS = {"enabled": True, "repair": True, "max_jump": 3.0}
+ALERT_DEFAULTS = {"enabled": False, "signals": ["DM9", "DM13"], "batch_size": 20, "max_per_hour": 100,
+                  "pause_seconds": 1.0, "wait_seconds": 30, "sinks": []}
+REPORT_TIMEFRAMES = ("1D", "1W")   # what the report, snapshots and alerts read
+SINK_TYPES = ("webhook", "smtp", "file", "memory")
+SECTOR_WATCH_DEFAULTS = {"universe": "sectors_cache.csv", "period": "6mo", "poll_period": "5d",
+                         "every_seconds": 120, "workers": 6,
+                         "reports": ["docs/sectors.html", "docs/index.html"]}
+PROFILE_DEFAULTS = {
+    "description": "",
+    "universes": [],
+    "sector_universe": None,
+    "timeframes": [],
+    "report": "docs/index.html",
+    "store_history": False,
+    "charts": False,
+    "every_minutes": None,
+    "live": False,
+    "cache_key_prefix": "",
+}
+
+
+class ConfigError(ValueError):
+    pass
+
+
+def load_config(path=CONFIG_FILE):
+    if not os.path.exists(path):
+        raise ConfigError(f"Scan config {path} not found")
+    with open(path, "rb") as f:
+        raw = tomllib.load(f)
+
+    config = {
+        "fetch": {**FETCH_DEFAULTS, **raw.get("fetch", {})},
+        "ranking": {**RANKING_DEFAULTS, **raw.get("ranking", {})},
+        "memory": {**MEMORY_DEFAULTS, **raw.get("memory", {})},
+        "quality": {**QUALITY_DEFAULTS, **raw.get("quality", {})},
+        "charts": {**CHART_DEFAULTS, **raw.get("charts", {})},
+        "alerts": {**ALERT_DEFAULTS, **raw.get("alerts", {})},
+        "sector_watch": {**SECTOR_WATCH_DEFAULTS, **raw.get("sector_watch", {})},
+        "timeframes": raw.get("timeframes", {}),
+        "profiles": {},
+        "default_profiles": raw.get("default_profiles", []),
+    }
+
+    if config["charts"]["backend"] not in ("matplotlib", "svg"):
+        raise ConfigError(f"[charts] backend must be 'matplotlib' or 'svg', got {config['charts']['backend']!r}")
+
+    for sink in config["alerts"]["sinks"]:
+        if sink.get("type") not in SINK_TYPES:
+            raise ConfigError(f"[[alerts.sinks]] type must be one of {', '.join(SINK_TYPES)}, got {sink.get('type')!r}")
+
+    for label, timeframe in config["timeframes"].items():
+        if "interval" not in timeframe or "period" not in timeframe:
+            raise ConfigError(f"Timeframe {label!r} needs both 'interval' and 'period'")
+
+    for name, profile in raw.get("profiles", {}).items():
+        profile = {**PROFILE_DEFAULTS, **profile, "name": name}
+        unknown = [tf for tf in profile["timeframes"] if tf not in config["timeframes"]]
+        if unknown:
+            raise ConfigError(f"Profile {name!r} uses undefined timeframes: {', '.join(unknown)}")
+        unreported = [tf for tf in profile["timeframes"] if tf not in REPORT_TIMEFRAMES]
+        if unreported:
+            raise ConfigError(f"Profile {name!r} lists timeframes the report can't show: {', '.join(unreported)} "
+                              f"(profile timeframes are {' and '.join(REPORT_TIMEFRAMES)}; "
+                              f"sector ETFs come from sector_universe)")
+        if profile["sector_universe"] and "Sector" not in config["timeframes"]:
+            raise ConfigError(f"Profile {name!r} has a sector_universe but no [timeframes.Sector]")
+        if not profile["universes"] and not profile["sector_universe"]:
+            raise ConfigError(f"Profile {name!r} has nothing to scan")
+        config["profiles"][name] = profile
+
+    for name in config["default_profiles"]:
+        if name not in config["profiles"]:
+            raise ConfigError(f"default_profiles lists unknown profile {name!r}")
+    return config
+
+
+def select_profiles(config, names=None):
+    names = names or config["default_profiles"] or list(config["profiles"])
+    missing = [n for n in names if n not in config["profiles"]]
+    if missing:
+        raise ConfigError(f"Unknown profile(s): {', '.join(missing)}. "
+                          f"Available: {', '.join(config['profiles'])}")
+    return [config["profiles"][n] for n in names]
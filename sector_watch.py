@@ -0,0 +1,130 @@
+"""Low-latency sector ETF loop: a handful of series kept hot in memory, polled with a short fetch.
+
+The first cycle loads the ETFs from their own cache file (cache/sector_watch_1d.pkl,
+never shared with the market scans) or fetches the full period. Every cycle
+after that asks only for the last few days, splices them onto the hot frames
+and recounts. The grid is swapped into the existing reports between the
+GRID_START / GRID_END markers, leaving the rest of each page alone.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import dm_kernels
+import price_cache
+
+CACHE_FILE = os.path.join("cache", "sector_watch_1d.pkl")
+CACHE_KEY = "SectorWatch"
+KEEP_BARS = 130          # plenty for the counts; older bars are dropped as new ones arrive
+GRID_START = "<!-- sector-grid:start -->"
+GRID_END = "<!-- sector-grid:end -->"
+
+
+class SectorWatch:
+    """Hot per-ETF frames plus the fetch/merge/count cycle around them.
+
+    fetch(tickers, period) returns {ticker: frame} normalized like main.normalize_bars.
+    It's called from a small persistent thread pool, so each worker keeps its
+    own warm HTTP session between cycles.
+    """
+
+    def __init__(self, sector_map, fetch, period="6mo", poll_period="5d", workers=6, cache_file=CACHE_FILE):
+        self.sector_map = sector_map
+        self.tickers = sorted(sector_map)
+        self.fetch = fetch
+        self.period = period
+        self.poll_period = poll_period
+        self.cache_file = cache_file
+        self.workers = max(1, min(workers, len(self.tickers)))
+        self.pool = ThreadPoolExecutor(max_workers=self.workers)
+        self.frames = {}
+
+    def _fetch(self, tickers, period):
+        if not tickers:
+            return {}
+        groups = [list(g) for g in np.array_split(tickers, min(self.workers, len(tickers)))]
+        data = {}
+        for part in self.pool.map(lambda group: self._fetch_group(group, period), groups):
+            data.update(part)
+        return data
+
+    def _fetch_group(self, group, period):
+        # If the group's request fails, each ETF is tried on its own so one bad
+        # symbol doesn't cost the rest their refresh
+        try:
+            return self.fetch(group, period)
+        except Exception as e:
+            if len(group) == 1:
+                print(f"⚠️ Sector watch: fetching {group[0]} failed: {e!r}")
+                return {}
+        return {t: df for ticker in group for t, df in self._fetch_group([ticker], period).items()}
+
+    def warm(self):
+        """Fill the hot frames from the watch's own cache, fetching the full period for anything missing."""
+        if os.path.exists(self.cache_file):
+            try:
+                _, cached = price_cache.load_price_cache(self.cache_file, "1d")
+                self.frames = {t: df for t, df in cached.items() if t in self.sector_map}
+            except price_cache.CacheError as e:
+                print(f"⚠️ Ignoring unusable sector watch cache: {e}")
+        missing = [t for t in self.tickers if t not in self.frames]
+        self.frames.update(self._fetch(missing, self.period))
+        self.scan()  # loads the JIT-compiled kernel now rather than inside the first timed cycle
+        return len(missing)
+
+    def poll(self):
+        """Fetch the last few bars and splice them on; a ticker whose new bars don't
+        overlap its hot frame (the loop was paused for a while) is refetched in full."""
+        recent = self._fetch(self.tickers, self.poll_period)
+        gaps = []
+        for ticker, new in recent.items():
+            old = self.frames.get(ticker)
+            if old is None or not len(new) or new.index[0] > old.index[-1]:
+                gaps.append(ticker)
+                continue
+            try:
+                self.frames[ticker] = pd.concat([old[old.index < new.index[0]], new]).iloc[-KEEP_BARS:]
+            except Exception as e:
+                print(f"⚠️ Sector watch: keeping the previous bars for {ticker}: {e!r}")
+        self.frames.update(self._fetch(gaps, self.period))
+        price_cache.write_price_cache(self.cache_file, self.frames, "1d", self.period, CACHE_KEY)
+        return len(recent), len(gaps)
+
+    def scan(self):
+        """Tops/Bottoms in the same (ticker, close, signal, sector) rows the full sector scan makes."""
+        tickers = [t for t in self.tickers if t in self.frames and len(self.frames[t])]
+        closes = [self.frames[t]["close"].to_numpy(dtype=float) for t in tickers]
+        values, offsets = dm_kernels.pack_series(closes)
+        up, dn = dm_kernels.last_counts(values, offsets)
+        results = {"Tops": [], "Bottoms": []}
+        for ticker, close, up_count, dn_count in zip(tickers, closes, up, dn):
+            if up_count in (9, 13):
+                results["Tops"].append((ticker, float(close[-1]), f"DM{up_count} Top", self.sector_map[ticker]))
+            if dn_count in (9, 13):
+                results["Bottoms"].append((ticker, float(close[-1]), f"DM{dn_count} Bot", self.sector_map[ticker]))
+        return results
+
+    def close(self):
+        self.pool.shutdown()
+
+
+def wrap_fragment(html):
+    return f"{GRID_START}{html}{GRID_END}"
+
+
+def replace_fragment(path, html):
+    """Swap the marked grid in an existing report; False if the page has no markers yet."""
+    if not os.path.exists(path):
+        return False
+    with open(path, encoding="utf-8") as f:
+        page = f.read()
+    start, end = page.find(GRID_START), page.find(GRID_END)
+    if start < 0 or end < start:
+        return False
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(page[:start] + wrap_fragment(html) + page[end + len(GRID_END):])
+    os.replace(tmp, path)
+    return True
@@ -0,0 +1,51 @@
+"""Split a universe into shards that are fetched, scanned and released one at a time.
+
+With a memory ceiling set, the shard size halves whenever resident memory after
+a shard is over the ceiling, so a small CI runner degrades to smaller shards
+instead of being OOM-killed.
+"""
+import gc
+import os
+import resource
+import sys
+
+MIN_SHARD = 50
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)  # bytes on macOS, KiB on Linux
+
+
+def current_rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return peak_rss_mb()  # no procfs: the peak is the best upper bound we have
+
+
+class ShardPlanner:
+    def __init__(self, size, max_rss_mb=0, label=""):
+        self.size = max(1, int(size))
+        self.max_rss_mb = max_rss_mb or 0
+        self.label = label
+        self.count = 0
+        self.largest = 0
+
+    def shards(self, items):
+        i = 0
+        while i < len(items):
+            shard = items[i:i + self.size]
+            i += len(shard)
+            self.count += 1
+            self.largest = max(self.largest, len(shard))
+            yield shard
+
+            gc.collect()  # drop the shard's frames before measuring
+            rss = current_rss_mb()
+            if self.max_rss_mb and rss > self.max_rss_mb and self.size > MIN_SHARD:
+                self.size = max(MIN_SHARD, self.size // 2)
+                print(f"🧠 [{self.label}] RSS {rss:.0f} MB over the {self.max_rss_mb} MB ceiling, "
+                      f"shard size now {self.size}")
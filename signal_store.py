@@ -0,0 +1,157 @@
+"""Persistent SQLite history of every scan's Tops/Bottoms, with a small query API and CLI.
+
+    python signal_store.py count --signal "DM9 Bot" --sector Technology --days 60
+    python signal_store.py list --ticker AAPL
+    python signal_store.py series --timeframe 1D --days 30
+"""
+import argparse
+import os
+import sqlite3
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+DB_PATH = "signal_history.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS signals (
+    date      TEXT NOT NULL,
+    timeframe TEXT NOT NULL,
+    ticker    TEXT NOT NULL,
+    sector    TEXT NOT NULL,
+    industry  TEXT NOT NULL,
+    signal    TEXT NOT NULL,
+    close     REAL,
+    ticker_id INTEGER,
+    PRIMARY KEY (date, timeframe, ticker, signal)
+);
+CREATE INDEX IF NOT EXISTS idx_signals_date_ticker ON signals (date, ticker);
+CREATE INDEX IF NOT EXISTS idx_signals_date_sector ON signals (date, sector);
+CREATE INDEX IF NOT EXISTS idx_signals_signal ON signals (signal);
+"""
+# ticker_id is the stable symbols.py code; rows from before it existed are NULL
+
+FIELDS = ("date", "timeframe", "ticker", "sector", "industry", "signal", "close")
+
+
+def connect(path=DB_PATH):
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(SCHEMA)
+    columns = {row["name"] for row in conn.execute("PRAGMA table_info(signals)")}
+    if "ticker_id" not in columns:
+        with conn:
+            conn.execute("ALTER TABLE signals ADD COLUMN ticker_id INTEGER")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_signals_ticker_id ON signals (ticker_id)")
+    return conn
+
+
+def append_signals(conn, date, timeframe, results, sector_map, ticker_ids=None):
+    """Store one scan's results; re-running the same candle date replaces that date's rows,
+    so a signal that has since gone away doesn't linger in the history."""
+    rows = []
+    for side in ("Tops", "Bottoms"):
+        for ticker, close, signal, industry in results[side]:
+            rows.append((date, timeframe, ticker, sector_map.get(ticker, "Unknown"),
+                         industry, signal, close, (ticker_ids or {}).get(ticker)))
+    with conn:
+        conn.execute("DELETE FROM signals WHERE date = ? AND timeframe = ?", (date, timeframe))
+        conn.executemany(
+            "INSERT OR REPLACE INTO signals (date, timeframe, ticker, sector, industry, signal, close, ticker_id) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+    return len(rows)
+
+
+def _where(signal=None, sector=None, timeframe=None, ticker=None, since=None, until=None):
+    clauses, params = [], []
+    for column, value in (("signal", signal), ("sector", sector),
+                          ("timeframe", timeframe), ("ticker", ticker)):
+        if value:
+            clauses.append(f"{column} = ?")
+            params.append(value)
+    if since:
+        clauses.append("date >= ?")
+        params.append(since)
+    if until:
+        clauses.append("date <= ?")
+        params.append(until)
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+def query_signals(conn, **filters):
+    where, params = _where(**filters)
+    sql = f"SELECT {', '.join(FIELDS)} FROM signals{where} ORDER BY date, timeframe, ticker"
+    return [dict(row) for row in conn.execute(sql, params)]
+
+
+def count_signals(conn, group_by="sector", **filters):
+    if group_by not in FIELDS:
+        raise ValueError(f"Cannot group by {group_by!r}")
+    where, params = _where(**filters)
+    sql = (f"SELECT {group_by} AS key, COUNT(*) AS n FROM signals{where} "
+           f"GROUP BY {group_by} ORDER BY n DESC, key")
+    return {row["key"]: row["n"] for row in conn.execute(sql, params)}
+
+
+def sector_series(conn, timeframe="1D", days=60, until=None):
+    """Signal counts per sector per candle date: {sector: {date: count}}."""
+    until = until or datetime.utcnow().strftime("%Y-%m-%d")
+    since = (datetime.strptime(until, "%Y-%m-%d") - timedelta(days=days)).strftime("%Y-%m-%d")
+    where, params = _where(timeframe=timeframe, since=since, until=until)
+    sql = f"SELECT date, sector, COUNT(*) AS n FROM signals{where} GROUP BY date, sector ORDER BY date"
+    series = defaultdict(dict)
+    for row in conn.execute(sql, params):
+        series[row["sector"]][row["date"]] = row["n"]
+    return dict(series)
+
+
+def _since(days):
+    if days is None:
+        return None
+    return (datetime.utcnow() - timedelta(days=days)).strftime("%Y-%m-%d")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the DeMark signal history database")
+    parser.add_argument("--db", default=DB_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name in ("list", "count", "series"):
+        p = sub.add_parser(name)
+        p.add_argument("--timeframe", help="1D, 1W or Sector")
+        p.add_argument("--days", type=int, help="only the last N days")
+        if name != "series":
+            p.add_argument("--signal", help='e.g. "DM9 Bot"')
+            p.add_argument("--sector")
+            p.add_argument("--ticker")
+        if name == "count":
+            p.add_argument("--by", default="sector", choices=FIELDS)
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        print(f"❌ No signal history at {args.db}")
+        return 1
+    conn = connect(args.db)
+
+    if args.command == "series":
+        series = sector_series(conn, timeframe=args.timeframe or "1D", days=args.days or 60)
+        for sector, points in sorted(series.items()):
+            print(f"{sector}: " + ", ".join(f"{d}={n}" for d, n in sorted(points.items())))
+        return 0
+
+    filters = dict(signal=args.signal, sector=args.sector, ticker=args.ticker,
+                   timeframe=args.timeframe, since=_since(args.days))
+    if args.command == "count":
+        counts = count_signals(conn, group_by=args.by, **filters)
+        for key, n in counts.items():
+            print(f"{key:<35} {n}")
+        print(f"{'Total':<35} {sum(counts.values())}")
+    else:
+        for row in query_signals(conn, **filters):
+            print(f"{row['date']}  {row['timeframe']:<6} {row['ticker']:<8} {row['signal']:<9} "
+                  f"{row['close'] if row['close'] is not None else 'N/A':>10}  {row['sector']}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,134 @@
+"""Per-run snapshots of the signal set, diffed against the previous run's.
+
+A snapshot is one sorted int32 array of ticker codes (see symbols.py) per signal
+type ("1D DM9 Bot", ...) plus the ticker list the codes index into, saved as an
+.npz in cache/. The latest snapshot and the one from the previous candle date
+are kept, so re-running on the same day still diffs against yesterday. Diffs
+are membership tests between sorted ID arrays (np.isin with a lookup table),
+linear in the sizes and the ID range.
+"""
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+
+SNAPSHOT_DIR = "cache"
+CHANGE_KINDS = ("new", "continuing", "dropped")
+
+
+def _path(key, previous=False):
+    return os.path.join(SNAPSHOT_DIR, f"snapshot_{key}{'_prev' if previous else ''}.npz")
+
+
+def signal_sets(results_by_label, ticker_ids):
+    """{"<label> <signal>": sorted unique int32 IDs} from each timeframe's Tops/Bottoms."""
+    members = {}
+    for label, results in results_by_label.items():
+        for key in ("Tops", "Bottoms"):
+            for ticker, _, signal, _ in results[key]:
+                members.setdefault(f"{label} {signal}", []).append(ticker_ids[ticker])
+    return {name: np.unique(np.array(ids, dtype=np.int32)) for name, ids in members.items()}
+
+
+def _read(path):
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path) as data:
+            return {
+                "as_of": str(data["as_of"]),
+                "tickers": data["tickers"].tolist(),
+                "sets": {name[4:]: data[name] for name in data.files if name.startswith("set:")},
+            }
+    except (OSError, ValueError, KeyError) as e:
+        print(f"⚠️ Ignoring unreadable snapshot {path}: {e}")
+        return None
+
+
+def load_previous(key, as_of):
+    """Latest snapshot from a candle date before as_of, or None."""
+    for path in (_path(key), _path(key, previous=True)):
+        snapshot = _read(path)
+        if snapshot and snapshot["as_of"] < as_of:
+            return snapshot
+    return None
+
+
+def save_snapshot(key, as_of, tickers, sets):
+    # Keep the last snapshot of an earlier date as the _prev file before overwriting
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    current = _read(_path(key))
+    if current and current["as_of"] < as_of:
+        os.replace(_path(key), _path(key, previous=True))
+    tmp = _path(key) + ".tmp.npz"
+    np.savez(tmp, as_of=np.array(as_of), tickers=np.array(tickers, dtype=str),
+             **{f"set:{name}": ids for name, ids in sets.items()})
+    os.replace(tmp, _path(key))
+    return _path(key)
+
+
+def _remap(previous, tickers, ticker_ids):
+    # Symbol-table codes are append-only, so an older snapshot's ticker list is a
+    # prefix of today's and its IDs can be used as they are. Otherwise (the table
+    # was rebuilt) translate by name; tickers no longer known get IDs past the end
+    # so they can still show up as dropped
+    if list(tickers[:len(previous["tickers"])]) == previous["tickers"]:
+        return previous["sets"], list(tickers)
+    names = list(tickers)
+    codes = np.empty(len(previous["tickers"]), dtype=np.int32)
+    for i, ticker in enumerate(previous["tickers"]):
+        code = ticker_ids.get(ticker)
+        if code is None:
+            code = len(names)
+            names.append(ticker)
+        codes[i] = code
+    return {name: np.unique(codes[ids]) for name, ids in previous["sets"].items()}, names
+
+
+def diff(sets, previous, tickers, ticker_ids):
+    """{signal type: {"new"|"continuing"|"dropped": [tickers]}} against the previous snapshot."""
+    empty = np.empty(0, dtype=np.int32)
+    previous_sets, names = _remap(previous, tickers, ticker_ids) if previous else ({}, list(tickers))
+    changes = {}
+    for name in sorted(set(sets) | set(previous_sets)):
+        current, before = sets.get(name, empty), previous_sets.get(name, empty)
+        seen = np.isin(current, before, assume_unique=True, kind="table")
+        kept = np.isin(before, current, assume_unique=True, kind="table")
+        changes[name] = {
+            "new": [names[i] for i in current[~seen]],
+            "continuing": [names[i] for i in current[seen]],
+            "dropped": [names[i] for i in before[~kept]],
+        }
+    return changes
+
+
+def signal_details(results_by_label):
+    """{(signal type, ticker): {"close", "industry"}} for every reported signal."""
+    details = {}
+    for label, results in results_by_label.items():
+        for key in ("Tops", "Bottoms"):
+            for ticker, close, signal, industry in results[key]:
+                details[(f"{label} {signal}", ticker)] = {"close": close, "industry": industry}
+    return details
+
+
+def write_feed(path, as_of, previous_as_of, changes, results_by_label):
+    """JSON feed of the diff for downstream alerting; new and continuing rows carry close and industry."""
+    details = signal_details(results_by_label)
+    feed = {
+        "generated": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "as_of": as_of,
+        "previous_as_of": previous_as_of,
+        "signals": {
+            name: {kind: [{"ticker": t, **details.get((name, t), {})} for t in kinds[kind]]
+                   for kind in CHANGE_KINDS}
+            for name, kinds in changes.items()
+        },
+    }
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(feed, f, indent=1)
+    os.replace(tmp, path)
+    return path
@@ -0,0 +1,155 @@
+"""Per-stage profiling for a scanner run: cProfile stats, collapsed stacks and tracemalloc.
+
+Stages are marked in main.py with `with stage_profiler.stage("scan"):`. Until
+enable() is called that is a no-op, so normal runs pay nothing. When enabled,
+each stage gets:
+
+  <stage>.prof / <stage>.txt   cProfile stats (the stage's own time, not its nested stages')
+  memory_<stage>.txt           tracemalloc top allocators over the stage (trace_memory only:
+                               tracing every allocation makes a run several times slower)
+  stacks.collapsed             sampled stacks, one "stage;frame;frame count" per line,
+                               ready for flamegraph.pl or speedscope
+  summary.txt                  wall time, calls and allocation per stage
+"""
+import cProfile
+import io
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+SAMPLE_SECONDS = 0.01
+TOP_ALLOCATORS = 15
+TOP_FUNCTIONS = 40
+
+_profiler = None
+
+
+class StageProfiler:
+    def __init__(self, out_dir, sample_seconds=SAMPLE_SECONDS, trace_memory=False):
+        self.out_dir = out_dir
+        self.trace_memory = trace_memory
+        self.sample_seconds = sample_seconds
+        self.profiles = {}
+        self.stack = []  # (name, cProfile.Profile) of the stages currently open
+        self.wall = defaultdict(float)
+        self.calls = Counter()
+        self.allocated = Counter()
+        self.memory_stats = defaultdict(list)
+        self.samples = Counter()
+        self.frame_names = {}
+        self.main_thread = threading.main_thread().ident
+        self.stopped = threading.Event()
+        self.sampler = threading.Thread(target=self._sample, name="stage-sampler", daemon=True)
+
+    def start(self):
+        os.makedirs(self.out_dir, exist_ok=True)
+        if self.trace_memory:
+            tracemalloc.start()  # one frame per allocation: snapshots stay cheap on a big heap
+        self.sampler.start()
+
+    def _sample(self):
+        # Walk the main thread's stack every few ms; the root frame is the open stage
+        while not self.stopped.wait(self.sample_seconds):
+            frame = sys._current_frames().get(self.main_thread)
+            stages = [name for name, _ in self.stack]
+            if frame is None or not stages:
+                continue
+            frames = []
+            while frame is not None:
+                frames.append(self._frame_name(frame.f_code))
+                frame = frame.f_back
+            self.samples[";".join(stages + frames[::-1])] += 1
+
+    def _frame_name(self, code):
+        name = self.frame_names.get(code)
+        if name is None:
+            name = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+            self.frame_names[code] = name
+        return name
+
+    @contextmanager
+    def stage(self, name):
+        if self.stack:
+            self.stack[-1][1].disable()  # nested stage: time is charged to the inner one
+        profile = self.profiles.setdefault(name, cProfile.Profile())
+        self.stack.append((name, profile))
+        before = tracemalloc.take_snapshot() if self.trace_memory else None
+        started = time.perf_counter()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            self.wall[name] += time.perf_counter() - started
+            self.calls[name] += 1
+            if before is not None:
+                diff = tracemalloc.take_snapshot().compare_to(before, "lineno")
+                self.allocated[name] += sum(stat.size_diff for stat in diff)
+                self.memory_stats[name].extend(diff[:TOP_ALLOCATORS])
+            self.stack.pop()
+            if self.stack:
+                self.stack[-1][1].enable()
+
+    def finish(self):
+        self.stopped.set()
+        self.sampler.join()
+        if self.trace_memory:
+            tracemalloc.stop()
+
+        for name, profile in self.profiles.items():
+            filename = _safe(name)
+            profile.dump_stats(os.path.join(self.out_dir, f"{filename}.prof"))
+            text = io.StringIO()
+            pstats.Stats(profile, stream=text).sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+            with open(os.path.join(self.out_dir, f"{filename}.txt"), "w") as f:
+                f.write(text.getvalue())
+
+        for name, stats in self.memory_stats.items():
+            stats = sorted(stats, key=lambda s: -s.size_diff)[:TOP_ALLOCATORS]
+            with open(os.path.join(self.out_dir, f"memory_{_safe(name)}.txt"), "w") as f:
+                f.writelines(f"{stat}\n" for stat in stats)
+
+        with open(os.path.join(self.out_dir, "stacks.collapsed"), "w") as f:
+            f.writelines(f"{stack} {count}\n" for stack, count in sorted(self.samples.items()))
+
+        lines = [f"{'stage':<16}{'calls':>6}{'wall s':>10}" + (f"{'alloc MB':>10}" if self.trace_memory else "")]
+        for name in sorted(self.wall, key=lambda n: -self.wall[n]):
+            alloc = f"{self.allocated[name] / 1e6:>10.1f}" if self.trace_memory else ""
+            lines.append(f"{name:<16}{self.calls[name]:>6}{self.wall[name]:>10.2f}{alloc}")
+        with open(os.path.join(self.out_dir, "summary.txt"), "w") as f:
+            f.write("\n".join(lines) + "\n")
+        print("\n⏱️ Stage profile (wall time includes nested stages)\n" + "\n".join(lines))
+        print(f"🔥 Profiling output in {self.out_dir}/ ({sum(self.samples.values())} stack samples)")
+
+
+def _safe(name):
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", name)
+
+
+def enable(out_dir="profiling", sample_seconds=SAMPLE_SECONDS, trace_memory=False):
+    global _profiler
+    _profiler = StageProfiler(out_dir, sample_seconds, trace_memory)
+    _profiler.start()
+    return _profiler
+
+
+@contextmanager
+def stage(name):
+    if _profiler is None:
+        yield
+        return
+    with _profiler.stage(name):
+        yield
+
+
+def finish():
+    global _profiler
+    if _profiler is not None:
+        _profiler.finish()
+        _profiler = None
@@ -0,0 +1,162 @@
+"""Hand-built SVG bar and line charts, so the report can skip matplotlib entirely.
+
+Only what the report needs: grouped horizontal bars and a multi-series line
+chart with date labels, written as standalone .svg files that <img> can load,
+plus inline sparklines for the signal tables.
+"""
+import os
+from xml.sax.saxutils import escape
+
+import numpy as np
+
+FONT = "font-family='Arial, sans-serif'"
+PALETTE = ["#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd", "#8c564b",
+           "#e377c2", "#7f7f7f", "#bcbd22", "#17becf"]
+
+
+def _nice_max(value):
+    # Round the axis maximum up to 1, 2 or 5 times a power of ten
+    if value <= 0:
+        return 1
+    magnitude = 10 ** (len(str(int(value))) - 1)
+    for step in (1, 2, 5, 10):
+        if value <= step * magnitude:
+            return step * magnitude
+    return 10 * magnitude
+
+
+def _ticks(maximum, count=5):
+    return [maximum * i / count for i in range(count + 1)]
+
+
+def _fmt(value):
+    return f"{value:g}" if value == int(value) else f"{value:.1f}"
+
+
+def _write(out_path, width, height, parts):
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    with open(out_path, "w", encoding="utf-8") as f:
+        f.write(f"<svg xmlns='http://www.w3.org/2000/svg' width='{width}' height='{height}' "
+                f"viewBox='0 0 {width} {height}' {FONT} font-size='12'>\n")
+        f.write(f"<rect width='{width}' height='{height}' fill='white'/>\n")
+        f.write("\n".join(parts))
+        f.write("\n</svg>\n")
+    return out_path
+
+
+def _legend(series, x, y):
+    parts = []
+    for i, (label, color, _) in enumerate(series):
+        parts.append(f"<rect x='{x}' y='{y + 18 * i}' width='12' height='12' fill='{color}'/>"
+                     f"<text x='{x + 18}' y='{y + 18 * i + 10}'>{escape(label)}</text>")
+    return parts
+
+
+def horizontal_bars(categories, series, title, xlabel, out_path, width=1000):
+    """Grouped horizontal bars: series is [(label, color, values)], one value per category."""
+    left, right, top, bottom = 200, 140, 40, 50
+    row = 14 * len(series) + 10
+    height = top + bottom + row * max(len(categories), 1)
+    plot_w = width - left - right
+    maximum = _nice_max(max((v for _, _, values in series for v in values), default=0))
+    scale = plot_w / maximum
+
+    parts = [f"<text x='{width / 2}' y='24' text-anchor='middle' font-size='16'>{escape(title)}</text>"]
+    for tick in _ticks(maximum):
+        x = left + tick * scale
+        parts.append(f"<line x1='{x:.1f}' y1='{top}' x2='{x:.1f}' y2='{height - bottom}' stroke='#ddd'/>"
+                     f"<text x='{x:.1f}' y='{height - bottom + 16}' text-anchor='middle'>{_fmt(tick)}</text>")
+    for i, category in enumerate(categories):
+        y0 = top + i * row + 5
+        parts.append(f"<text x='{left - 8}' y='{y0 + row / 2:.1f}' text-anchor='end' "
+                     f"dominant-baseline='middle'>{escape(str(category))}</text>")
+        for j, (label, color, values) in enumerate(series):
+            parts.append(f"<rect x='{left}' y='{y0 + 14 * j}' width='{values[i] * scale:.1f}' height='12' "
+                         f"fill='{color}'><title>{escape(label)}: {values[i]}</title></rect>")
+    parts.append(f"<text x='{left + plot_w / 2}' y='{height - 12}' text-anchor='middle'>{escape(xlabel)}</text>")
+    parts += _legend(series, width - right + 15, top)
+    return _write(out_path, width, height, parts)
+
+
+def line_chart(x_labels, series, title, ylabel, out_path, width=900, height=440, markers=False):
+    """Lines over evenly spaced x positions: series is [(label, color, values)] aligned with x_labels."""
+    left, right, top, bottom = 60, 170 if len(series) > 1 else 20, 40, 60
+    plot_w, plot_h = width - left - right, height - top - bottom
+    values = [v for _, _, vs in series for v in vs]
+    low = min(0, min(values, default=0))
+    maximum = _nice_max(max(values, default=0) - low) + low
+    span = (maximum - low) or 1
+    step = plot_w / max(len(x_labels) - 1, 1)
+
+    def xy(i, v):
+        return left + i * step, top + plot_h * (1 - (v - low) / span)
+
+    parts = [f"<text x='{width / 2}' y='24' text-anchor='middle' font-size='16'>{escape(title)}</text>"]
+    for tick in _ticks(span):
+        _, y = xy(0, low + tick)
+        parts.append(f"<line x1='{left}' y1='{y:.1f}' x2='{left + plot_w}' y2='{y:.1f}' stroke='#ddd'/>"
+                     f"<text x='{left - 6}' y='{y + 4:.1f}' text-anchor='end'>{_fmt(low + tick)}</text>")
+    every = max(1, len(x_labels) // 10)
+    for i in range(0, len(x_labels), every):
+        x, _ = xy(i, low)
+        parts.append(f"<text x='{x:.1f}' y='{top + plot_h + 14}' text-anchor='end' "
+                     f"transform='rotate(-45 {x:.1f} {top + plot_h + 14})'>{escape(str(x_labels[i]))}</text>")
+    for label, color, vs in series:
+        points = " ".join(f"{x:.1f},{y:.1f}" for x, y in (xy(i, v) for i, v in enumerate(vs)))
+        parts.append(f"<polyline points='{points}' fill='none' stroke='{color}' stroke-width='1.5'>"
+                     f"<title>{escape(label)}</title></polyline>")
+        if markers:
+            parts += [f"<circle cx='{x:.1f}' cy='{y:.1f}' r='2' fill='{color}'/>"
+                      for x, y in (xy(i, v) for i, v in enumerate(vs))]
+    parts.append(f"<text x='14' y='{top + plot_h / 2}' text-anchor='middle' "
+                 f"transform='rotate(-90 14 {top + plot_h / 2})'>{escape(ylabel)}</text>")
+    if len(series) > 1:
+        parts += _legend(series, width - right + 15, top)
+    return _write(out_path, width, height, parts)
+
+
+def sparklines(values, up, dn, offsets, rows, bars=40, width=120, height=26):
+    """Inline <svg> sparklines of the last `bars` closes for tickers `rows` of a packed array.
+
+    up/dn are the per-bar counts from dm_kernels.count_series. The side with the
+    larger last count is overlaid: a dot on every bar of the current run and the
+    count itself at the right edge. Coordinates for all rows are computed in one
+    pass; only the string formatting is per ticker.
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    if not len(rows):
+        return []
+    label_w, pad = 16, 2
+    ends = offsets[rows + 1]
+    idx = ends[:, None] - bars + np.arange(bars)
+    valid = idx >= offsets[rows][:, None]
+    idx = np.where(valid, idx, ends[:, None] - 1)
+    # Missing closes (data_quality repair off) are left out of the line and the dots
+    valid &= np.isfinite(values[idx])
+
+    closes = np.where(valid, values[idx], np.nan)
+    low = np.min(np.where(valid, closes, np.inf), axis=1, keepdims=True)
+    high = np.max(np.where(valid, closes, -np.inf), axis=1, keepdims=True)
+    low[~np.isfinite(low)] = 0
+    span = high - low
+    span[~np.isfinite(span) | (span == 0)] = 1
+    xs = pad + np.arange(bars) * (width - label_w - 2 * pad) / (bars - 1)
+    ys = pad + (height - 2 * pad) * (1 - (closes - low) / span)
+
+    is_up = up[ends - 1] >= dn[ends - 1]
+    counts = np.where(is_up[:, None], up[idx], dn[idx])
+    last = counts[:, -1]
+    in_run = valid & (np.arange(bars) >= bars - last[:, None])
+
+    out = []
+    for r in range(len(rows)):
+        color = "#d62728" if is_up[r] else "#2ca02c"
+        points = " ".join(f"{x:.1f},{y:.1f}" for x, y in zip(xs[valid[r]], ys[r][valid[r]]))
+        dots = "".join(f"<circle cx='{x:.1f}' cy='{y:.1f}' r='1.5' fill='{color}'/>"
+                       for x, y in zip(xs[in_run[r]], ys[r][in_run[r]]))
+        out.append(f"<svg xmlns='http://www.w3.org/2000/svg' width='{width}' height='{height}' "
+                   f"viewBox='0 0 {width} {height}' style='vertical-align: middle;'>"
+                   f"<polyline points='{points}' fill='none' stroke='#555' stroke-width='1'/>{dots}"
+                   f"<text x='{width - 1}' y='{height / 2 + 4:.0f}' text-anchor='end' font-size='11' "
+                   f"{FONT} font-weight='bold' fill='{color}'>{last[r]}</text></svg>")
+    return out
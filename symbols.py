@@ -0,0 +1,70 @@
+"""Persistent symbol table: stable small integer codes for tickers, sectors and industries.
+
+Codes are list positions in symbols.json and are only ever appended, so a code
+means the same name in every run and in the history store. Scans, snapshots
+and aggregations work on the codes; names come back out through decode() when
+the report is rendered. The file is committed next to signal_history.db rather
+than kept in cache/, so a cache eviction can't renumber anything.
+"""
+import json
+import os
+
+import numpy as np
+
+SYMBOLS_FILE = "symbols.json"
+KINDS = ("ticker", "sector", "industry")
+
+
+class SymbolTable:
+    def __init__(self, names=None, path=SYMBOLS_FILE):
+        self.path = path
+        self._names = {kind: list((names or {}).get(kind, [])) for kind in KINDS}
+        self._ids = {kind: {name: i for i, name in enumerate(self._names[kind])} for kind in KINDS}
+        self.dirty = False
+
+    def encode(self, kind, values):
+        """int32 codes for values, giving unseen names the next free codes."""
+        ids, names = self._ids[kind], self._names[kind]
+        codes = np.empty(len(values), dtype=np.int32)
+        for i, value in enumerate(values):
+            code = ids.get(value)
+            if code is None:
+                code = ids[value] = len(names)
+                names.append(value)
+                self.dirty = True
+            codes[i] = code
+        return codes
+
+    def ids(self, kind):
+        """{name: code}; shared with the table, so treat it as read-only."""
+        return self._ids[kind]
+
+    def names(self, kind):
+        """Every name of a kind, indexed by code."""
+        return self._names[kind]
+
+    def decode(self, kind, codes):
+        names = self._names[kind]
+        return [names[c] for c in np.asarray(codes).tolist()]
+
+    def save(self):
+        if not self.dirty:
+            return False
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, **self._names}, f, indent=0)
+        os.replace(tmp, self.path)
+        self.dirty = False
+        return True
+
+
+def load(path=SYMBOLS_FILE):
+    if not os.path.exists(path):
+        return SymbolTable(path=path)
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        # Renumbering would silently break the history store's codes, so refuse instead
+        raise RuntimeError(f"Symbol table {path} is unreadable ({e}); restore it from git") from e
+    return SymbolTable(data, path=path)